@@ -0,0 +1,124 @@
+import copy
+from abc import ABC, abstractmethod
+import time
+from collections import OrderedDict
+from decouple import config
+
+
+class CacheBackend(ABC):
+    """
+    Storage behind a document cache. Values are plain Mongo documents; a shared
+    backend (e.g. Redis) is responsible for encoding them.
+    """
+
+    @abstractmethod
+    async def get(self, key: str):
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: dict):
+        ...
+
+    @abstractmethod
+    async def delete(self, *keys: str):
+        ...
+
+    @abstractmethod
+    async def clear(self):
+        ...
+
+    def __len__(self):
+        return 0
+
+
+class InMemoryCache(CacheBackend):
+    """
+    Per-process LRU cache whose entries also expire `ttl` seconds after being written.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    async def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return copy.deepcopy(value)
+
+    async def set(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class UserCache:
+    """
+    Caches user documents under both their username and their id.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    async def _get(self, key):
+        user = await self.backend.get(key)
+        if user is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return user
+
+    async def get_by_username(self, username: str):
+        return await self._get(f"username:{username}")
+
+    async def get_by_id(self, id: str):
+        return await self._get(f"id:{id}")
+
+    async def put(self, user: dict):
+        """
+        Keeps whichever of the cached and the given document has the higher version, so
+        a read that raced a write cannot replace the written document with an older one.
+        """
+        cached = await self.backend.get(f"id:{user['_id']}")
+        if cached is not None and (cached.get("version") or 0) > (user.get("version") or 0):
+            return
+        await self.backend.set(f"username:{user['username']}", user)
+        await self.backend.set(f"id:{user['_id']}", user)
+
+    async def invalidate(self, user: dict):
+        await self.backend.delete(f"username:{user['username']}", f"id:{user['_id']}")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "size": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+user_cache = UserCache(InMemoryCache(
+    maxsize=config("USER_CACHE_SIZE", default=10000, cast=int),
+    ttl=config("USER_CACHE_TTL", default=60, cast=float),
+))
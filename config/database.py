@@ -1,14 +1,201 @@
-from pymongo import MongoClient
+import asyncio
+import threading
+from collections import defaultdict
 import motor.motor_asyncio
-from decouple import config
+from pymongo import monitoring, read_preferences
+from decouple import config, Csv
 
 MONGO_DETAILS = config("MONGO_DETAILS")
+DATABASE_NAME = config("MONGO_DATABASE", default="skillshare")
 
-client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_DETAILS)
 
-db = client.skillshare
+def _optional_int(value):
+    return int(value) if value not in ("", None) else None
 
-user_collection = db.get_collection("users")
-article_collection = db.get_collection("articles")
-review_collection = db.get_collection("reviews")
-login_collection = db.get_collection("logins")
\ No newline at end of file
+
+# Client settings. Every worker process holds its own pool, so the cluster sees up to
+# MONGO_MAX_POOL_SIZE x workers x instances connections; size it to stay below the
+# cluster's connection limit. Unset optional values keep the driver's default.
+CLIENT_OPTIONS = {
+    "maxPoolSize": config("MONGO_MAX_POOL_SIZE", default=100, cast=int),
+    "minPoolSize": config("MONGO_MIN_POOL_SIZE", default=0, cast=int),
+    "maxIdleTimeMS": config("MONGO_MAX_IDLE_TIME_MS", default="", cast=_optional_int),
+    "waitQueueTimeoutMS": config("MONGO_WAIT_QUEUE_TIMEOUT_MS", default="", cast=_optional_int),
+    "serverSelectionTimeoutMS": config("MONGO_SERVER_SELECTION_TIMEOUT_MS", default=10000, cast=int),
+    "connectTimeoutMS": config("MONGO_CONNECT_TIMEOUT_MS", default=10000, cast=int),
+    "socketTimeoutMS": config("MONGO_SOCKET_TIMEOUT_MS", default="", cast=_optional_int),
+    "compressors": config("MONGO_COMPRESSORS", default="", cast=Csv()) or None,
+    "readPreference": config("MONGO_READ_PREFERENCE", default="primary"),
+}
+
+
+READ_PREFERENCE_MODES = {
+    "primaryPreferred": read_preferences.PrimaryPreferred,
+    "secondary": read_preferences.Secondary,
+    "secondaryPreferred": read_preferences.SecondaryPreferred,
+    "nearest": read_preferences.Nearest,
+}
+
+
+def read_preference(mode: str, max_staleness: int = -1):
+    """
+    Builds a read preference from its mode name. Only non-primary modes take a staleness
+    bound (in seconds, at least 90; -1 for none).
+    """
+    if mode == "primary":
+        return read_preferences.Primary()
+    if mode not in READ_PREFERENCE_MODES:
+        raise ValueError(f"Unknown read preference {mode}")
+    return READ_PREFERENCE_MODES[mode](max_staleness=max_staleness)
+
+
+# Routes by what their reads tolerate. "list" and "search" reads return feeds that may lag
+# a write by a moment, so they can be served by secondaries; everything else, including
+# every read that follows a write, stays on the client's read preference.
+MAX_STALENESS_SECONDS = config("MONGO_MAX_STALENESS_SECONDS", default=90, cast=int)
+ROUTE_READ_PREFERENCES = {
+    "list": read_preference(config("MONGO_LIST_READ_PREFERENCE", default="secondaryPreferred"), MAX_STALENESS_SECONDS),
+    "search": read_preference(config("MONGO_SEARCH_READ_PREFERENCE", default="secondaryPreferred"), MAX_STALENESS_SECONDS),
+}
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """
+    Connection pool counters per server, fed by the driver's pool events. The driver
+    emits them from its own threads, hence the lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._servers = defaultdict(lambda: {"open": 0, "in_use": 0, "waiting": 0, "checkout_failures": 0, "cleared": 0})
+
+    def _count(self, event, **changes):
+        with self._lock:
+            server = self._servers["%s:%s" % event.address]
+            for counter, change in changes.items():
+                server[counter] += change
+
+    def pool_created(self, event):
+        self._count(event)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._count(event, cleared=1)
+
+    def pool_closed(self, event):
+        with self._lock:
+            self._servers.pop("%s:%s" % event.address, None)
+
+    def connection_created(self, event):
+        self._count(event, open=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._count(event, open=-1)
+
+    def connection_check_out_started(self, event):
+        self._count(event, waiting=1)
+
+    def connection_check_out_failed(self, event):
+        self._count(event, waiting=-1, checkout_failures=1)
+
+    def connection_checked_out(self, event):
+        self._count(event, waiting=-1, in_use=1)
+
+    def connection_checked_in(self, event):
+        self._count(event, in_use=-1)
+
+    def snapshot(self):
+        with self._lock:
+            return {address: dict(counters) for address, counters in self._servers.items()}
+
+
+pool_stats = PoolStats()
+
+
+class Mongo:
+    """
+    Owns the Motor client. It is created by the app's lifespan (or by `run` for
+    maintenance jobs) rather than at import time, so it binds to the running event
+    loop and its pool is closed on shutdown.
+    """
+
+    def __init__(self):
+        self.client = None
+
+    def connect(self):
+        if self.client is None:
+            options = {name: value for name, value in CLIENT_OPTIONS.items() if value is not None}
+            self.client = motor.motor_asyncio.AsyncIOMotorClient(MONGO_DETAILS, event_listeners=[pool_stats], **options)
+        return self.client
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+    @property
+    def database(self):
+        if self.client is None:
+            raise RuntimeError("MongoDB client is not connected")
+        return self.client[DATABASE_NAME]
+
+
+mongo = Mongo()
+
+
+class Deferred:
+    """
+    Stands in for a database or collection that only exists once the client is
+    connected, so modules can keep importing them at import time.
+    """
+
+    def __init__(self, resolve):
+        self._resolve = resolve
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __getitem__(self, name):
+        return self._resolve()[name]
+
+
+def _collection(name, reads: str = None):
+    return Deferred(lambda: mongo.database.get_collection(name, read_preference=ROUTE_READ_PREFERENCES.get(reads)))
+
+
+def run(job, *args):
+    """
+    Runs a maintenance coroutine function with its own client, for `python -m` entry points.
+    """
+    async def main():
+        mongo.connect()
+        try:
+            return await job(*args)
+        finally:
+            mongo.close()
+    return asyncio.run(main())
+
+
+db = Deferred(lambda: mongo.database)
+
+user_collection = _collection("users")
+article_collection = _collection("articles")
+review_collection = _collection("reviews")
+login_collection = _collection("logins")
+rating_collection = _collection("ratings")
+skill_collection = _collection("skills")
+counter_collection = _collection("counters")
+conversation_collection = _collection("conversations")
+message_collection = _collection("messages")
+inbox_collection = _collection("inbox")
+
+# the same collections for routes that tolerate lagging reads, see ROUTE_READ_PREFERENCES
+user_list_collection = _collection("users", reads="list")
+article_list_collection = _collection("articles", reads="list")
+article_search_collection = _collection("articles", reads="search")
+review_list_collection = _collection("reviews", reads="list")
@@ -0,0 +1,108 @@
+import argparse
+import logging
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+from config.database import db, run
+
+logger = logging.getLogger(__name__)
+
+ARTICLE_TEXT_WEIGHTS = {"title": 10, "topic": 5, "body": 1}
+
+# collection name -> indexes the routes rely on
+INDEX_SPECS = {
+    "users": [
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+        # multikey, for skill/interest match candidates
+        IndexModel([("skill_ids", ASCENDING)], name="skill_ids"),
+        IndexModel([("interest_ids", ASCENDING)], name="interest_ids"),
+    ],
+    "articles": [
+        # backs the keyset-paginated feed sort in both directions
+        IndexModel([("created_at_sorting", DESCENDING), ("_id", DESCENDING)], name="created_at_sorting_id"),
+        # equality filters first so the feed sort walks a bounded range per value
+        IndexModel([("username", ASCENDING), ("created_at_sorting", DESCENDING), ("_id", DESCENDING)], name="username_created_at_sorting_id"),
+        IndexModel([("topic", ASCENDING), ("created_at_sorting", DESCENDING), ("_id", DESCENDING)], name="topic_created_at_sorting_id"),
+        IndexModel([(field, TEXT) for field in ARTICLE_TEXT_WEIGHTS], name="article_text", weights=ARTICLE_TEXT_WEIGHTS),
+    ],
+    "skills": [
+        IndexModel([("term", ASCENDING)], name="term_unique", unique=True),
+    ],
+    "conversations": [
+        IndexModel([("key", ASCENDING)], name="key_unique", unique=True),
+    ],
+    "messages": [
+        IndexModel([("conversation_id", ASCENDING), ("sent_at", DESCENDING), ("_id", DESCENDING)], name="conversation_id_sent_at_id"),
+    ],
+    "inbox": [
+        IndexModel([("username", ASCENDING), ("conversation_id", ASCENDING)], name="username_conversation_id_unique", unique=True),
+        IndexModel([("username", ASCENDING), ("last_sent_at", DESCENDING), ("_id", DESCENDING)], name="username_last_sent_at_id"),
+    ],
+    "logins": [
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+    ],
+    "reviews": [
+        IndexModel([("created_at_sorting", DESCENDING), ("_id", DESCENDING)], name="created_at_sorting_id"),
+        IndexModel([("created_about", ASCENDING), ("created_at_sorting", DESCENDING)], name="created_about_created_at_sorting"),
+    ],
+}
+
+
+async def ensure_indexes(dry_run: bool = False):
+    """
+    Creates any index from INDEX_SPECS that is missing. Indexes are matched on their
+    name or key pattern, so ones created by hand under another name are left alone.
+
+    Returns a report with one entry per index: "exists", "created", "would_create" or "failed".
+    """
+    report = []
+    for collection_name, indexes in INDEX_SPECS.items():
+        collection = db.get_collection(collection_name)
+        information = await collection.index_information()
+        existing = [list(info["key"]) for info in information.values()]
+        for index in indexes:
+            document = index.document
+            entry = {"collection": collection_name, "name": document["name"], "keys": list(document["key"].items())}
+            if entry["name"] in information or entry["keys"] in existing:
+                entry["status"] = "exists"
+            elif dry_run:
+                entry["status"] = "would_create"
+            else:
+                try:
+                    await collection.create_indexes([index])
+                    entry["status"] = "created"
+                except OperationFailure as err:
+                    entry["status"] = "failed"
+                    entry["error"] = str(err)
+            report.append(entry)
+            # uvicorn leaves the root logger unconfigured, so only warnings and errors
+            # reach the console at startup
+            if entry["status"] == "failed":
+                logger.error("index %s.%s failed: %s", collection_name, entry["name"], entry["error"])
+            elif entry["status"] == "would_create":
+                logger.warning("index %s.%s is missing and would be created", collection_name, entry["name"])
+            else:
+                logger.info("index %s.%s: %s", collection_name, entry["name"], entry["status"])
+    return report
+
+
+async def has_unique_index(collection_name: str, field: str):
+    """
+    Whether values of `field` are unique in the collection, under whatever name the
+    index was created.
+    """
+    information = await db.get_collection(collection_name).index_information()
+    return any(info.get("unique") and list(info["key"]) == [(field, ASCENDING)] for info in information.values())
+
+
+async def main(arguments):
+    report = await ensure_indexes(dry_run=arguments.dry_run)
+    for entry in report:
+        print(f'{entry["status"]:<13} {entry["collection"]}.{entry["name"]}' + (f': {entry["error"]}' if "error" in entry else ""))
+    if any(entry["status"] == "failed" for entry in report):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the MongoDB indexes the routes rely on")
+    parser.add_argument("--dry-run", action="store_true", help="only report which indexes would be created")
+    run(main, parser.parse_args())
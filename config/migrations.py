@@ -0,0 +1,181 @@
+import argparse
+import asyncio
+import importlib
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from decouple import config
+from pymongo import UpdateOne
+from config.database import db, run
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_BATCH_SIZE = config("MIGRATION_BATCH_SIZE", default=500, cast=int)
+MIGRATION_CONCURRENCY = config("MIGRATION_CONCURRENCY", default=4, cast=int)
+MIGRATION_THROTTLE = config("MIGRATION_THROTTLE", default=0.0, cast=float)
+# modules registering migrations, imported by the command line
+MIGRATION_MODULES = ("routes.versioning", "routes.timestamps", "routes.skills")
+STATE_COLLECTION = "migrations"
+
+
+class Migration:
+    """
+    A change to every document of `collection` matching `query`.
+
+    `transform` is a coroutine function receiving a batch of documents (read with
+    `projection`) and the database the migration runs against, which it uses for any
+    other collection it needs. It returns one update document per document, or None
+    for a document to leave alone. Migrations run in `version` order. A batch may be
+    applied again after an interrupted run, so updates should be idempotent.
+    """
+
+    def __init__(self, version: int, name: str, collection: str, transform, query: dict = None, projection: dict = None):
+        self.version = version
+        self.name = name
+        self.collection = collection
+        self.transform = transform
+        self.query = query or {}
+        self.projection = projection
+
+
+MIGRATIONS = {}
+
+
+def register(migration: Migration):
+    for existing in MIGRATIONS.values():
+        if migration.name == existing.name or migration.version == existing.version:
+            raise ValueError(f"Migration {migration.name} (version {migration.version}) clashes with {existing.name}")
+    MIGRATIONS[migration.name] = migration
+    return migration
+
+
+def registered():
+    return sorted(MIGRATIONS.values(), key=lambda migration: migration.version)
+
+
+class MigrationRunner:
+    """
+    Applies migrations in batches of `batch_size` documents, read in _id order and
+    written with one unordered bulk_write each. At most `concurrency` writes are in
+    flight, and the reader pauses `throttle` seconds between batches.
+
+    Progress is checkpointed per migration in the "migrations" collection as the last
+    _id whose batch, and every batch before it, has been written; a run that stops
+    resumes from there. Finished migrations are skipped.
+    """
+
+    def __init__(
+        self,
+        database=db,
+        batch_size: int = MIGRATION_BATCH_SIZE,
+        concurrency: int = MIGRATION_CONCURRENCY,
+        throttle: float = MIGRATION_THROTTLE,
+    ):
+        self.database = database
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.throttle = throttle
+
+    @property
+    def states(self):
+        return self.database[STATE_COLLECTION]
+
+    async def status(self):
+        states = {state["_id"]: state async for state in self.states.find({})}
+        return [{"version": migration.version, "name": migration.name, **states.get(migration.name, {})} for migration in registered()]
+
+    async def run_all(self, names: list = None):
+        reports = []
+        for migration in registered():
+            if not names or migration.name in names:
+                reports.append(await self.run(migration))
+        return reports
+
+    async def run(self, migration: Migration):
+        state = await self.states.find_one({"_id": migration.name}) or {"_id": migration.name, "matched": 0, "modified": 0}
+        if state.get("finished_at") is not None:
+            return state
+        state.setdefault("started_at", datetime.now(timezone.utc))
+        state["version"] = migration.version
+        collection = self.database[migration.collection]
+        slots = asyncio.Semaphore(self.concurrency)
+        pending = deque()
+        last_read = state.get("checkpoint")
+
+        async def write(requests):
+            try:
+                if requests:
+                    result = await collection.bulk_write(requests, ordered=False)
+                    state["matched"] += result.matched_count
+                    state["modified"] += result.modified_count
+            finally:
+                slots.release()
+
+        try:
+            while True:
+                query = dict(migration.query)
+                if last_read is not None:
+                    query["_id"] = {"$gt": last_read}
+                documents = await collection.find(query, migration.projection).sort("_id", 1).limit(self.batch_size).to_list(None)
+                if not documents:
+                    break
+                last_read = documents[-1]["_id"]
+                updates = await migration.transform(documents, self.database)
+                requests = [UpdateOne({"_id": document["_id"]}, update) for document, update in zip(documents, updates) if update is not None]
+                await slots.acquire()
+                pending.append((asyncio.create_task(write(requests)), last_read))
+                await self._checkpoint(state, pending)
+                if self.throttle:
+                    await asyncio.sleep(self.throttle)
+            await asyncio.gather(*(task for task, _ in pending))
+            await self._checkpoint(state, pending)
+        finally:
+            # let in-flight writes settle so the saved checkpoint covers every batch written
+            await asyncio.gather(*(task for task, _ in pending), return_exceptions=True)
+
+        state["finished_at"] = datetime.now(timezone.utc)
+        await self.states.replace_one({"_id": migration.name}, state, upsert=True)
+        logger.info("migration %s finished: %s matched, %s modified", migration.name, state["matched"], state["modified"])
+        return state
+
+    async def _checkpoint(self, state: dict, pending: deque):
+        """
+        Moves the checkpoint past the leading batches that have been written. A failed
+        batch raises here, leaving the checkpoint before it.
+        """
+        advanced = False
+        while pending and pending[0][0].done():
+            task, last_id = pending.popleft()
+            task.result()
+            state["checkpoint"] = last_id
+            advanced = True
+        if advanced:
+            await self.states.replace_one({"_id": state["_id"]}, state, upsert=True)
+
+
+async def main(arguments):
+    for module in MIGRATION_MODULES:
+        importlib.import_module(module)
+    runner = MigrationRunner(batch_size=arguments.batch_size, concurrency=arguments.concurrency, throttle=arguments.throttle)
+    if arguments.status:
+        for state in await runner.status():
+            print(state)
+        return
+    unknown = set(arguments.names) - set(MIGRATIONS)
+    if unknown:
+        raise SystemExit(f"Unknown migration(s): {', '.join(sorted(unknown))}")
+    for report in await runner.run_all(arguments.names):
+        print(report)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Run pending data migrations")
+    parser.add_argument("names", nargs="*", help="migrations to run (default: all pending)")
+    parser.add_argument("--status", action="store_true", help="list migrations and their progress")
+    parser.add_argument("--batch-size", type=int, default=MIGRATION_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=MIGRATION_CONCURRENCY)
+    parser.add_argument("--throttle", type=float, default=MIGRATION_THROTTLE, help="seconds to pause between batches")
+    # run the imported module's main, whose registry the migration modules fill
+    from config import migrations
+    run(migrations.main, parser.parse_args())
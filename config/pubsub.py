@@ -0,0 +1,115 @@
+import asyncio
+from abc import ABC, abstractmethod
+import logging
+from collections import defaultdict
+from decouple import config
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+from config.database import db
+
+logger = logging.getLogger(__name__)
+
+
+class PubSub(ABC):
+    """
+    Broadcasts messages to every worker subscribed to a channel, including the publisher.
+    """
+
+    def __init__(self):
+        self.handlers = defaultdict(list)
+
+    def subscribe(self, channel: str, handler):
+        self.handlers[channel].append(handler)
+
+    async def dispatch(self, channel: str, message: dict):
+        for handler in self.handlers.get(channel, ()):
+            try:
+                await handler(message)
+            except Exception:
+                logger.exception("pubsub handler for %s failed", channel)
+
+    @abstractmethod
+    async def publish(self, channel: str, message: dict):
+        ...
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class InMemoryPubSub(PubSub):
+    """
+    Delivers within this process only; for a single worker and for tests.
+    """
+
+    async def publish(self, channel, message):
+        await self.dispatch(channel, message)
+
+
+class MongoPubSub(PubSub):
+    """
+    Delivers across workers through a capped collection that every worker tails with
+    one tailable-await cursor, so no extra infrastructure is needed.
+    """
+
+    def __init__(self, database, name: str = "events", size: int = 16 * 1024 * 1024):
+        super().__init__()
+        self.database = database
+        self.name = name
+        self.size = size
+        self._task = None
+
+    async def publish(self, channel, message):
+        await self.database[self.name].insert_one({"channel": channel, "message": message})
+
+    async def start(self):
+        try:
+            await self.database.create_collection(self.name, capped=True, size=self.size)
+        except CollectionInvalid:
+            pass
+        self._task = asyncio.create_task(self._tail())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _tail(self):
+        collection = self.database[self.name]
+        last = await collection.find({}, {"_id": 1}).sort("$natural", -1).limit(1).to_list(1)
+        last_id = last[0]["_id"] if last else None
+        while True:
+            try:
+                # Resume in natural (insertion) order after the last event seen. ObjectIds
+                # from different workers are not ordered within a second, so filtering on
+                # _id could skip events; instead everything up to that event is read past.
+                # If it has already been evicted from the capped collection, every event
+                # still in it is newer.
+                skipping = last_id is not None and await collection.find_one({"_id": last_id}, {"_id": 1}) is not None
+                cursor = collection.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+                # Iteration stops at every getMore that found nothing within the server's
+                # await time, but the cursor stays open: keep reading it, and only reopen
+                # (and read past last_id again) once the server has closed it.
+                while cursor.alive:
+                    async for event in cursor:
+                        if skipping:
+                            skipping = event["_id"] != last_id
+                            continue
+                        last_id = event["_id"]
+                        await self.dispatch(event["channel"], event["message"])
+                    await asyncio.sleep(0.1)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("pubsub tail on %s failed", self.name)
+            # tailable cursors die on an empty collection; back off before reopening
+            await asyncio.sleep(1)
+
+
+pubsub = MongoPubSub(db) if config("PUBSUB_BACKEND", default="memory") == "mongo" else InMemoryPubSub()
@@ -1,8 +1,29 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from decouple import config
 from routes.app import router
+from routes.messages import router as messages_router
+from routes.auth import router as auth_router
+from config.database import mongo
+from config.indexes import ensure_indexes
+from config.pubsub import pubsub
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    mongo.connect()
+    if config("ENSURE_INDEXES", default=True, cast=bool):
+        await ensure_indexes(dry_run=config("INDEX_DRY_RUN", default=False, cast=bool))
+    await pubsub.start()
+    try:
+        yield
+    finally:
+        await pubsub.stop()
+        mongo.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -12,4 +33,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(router)
\ No newline at end of file
+app.include_router(router)
+app.include_router(messages_router)
+app.include_router(auth_router)
@@ -1,32 +1,81 @@
 from datetime import datetime
-from typing import Optional, List
-from fastapi import Body, HTTPException, status, APIRouter
-from fastapi.responses import Response
-from pydantic import BaseModel, Field, EmailStr
+from typing import ClassVar, Optional, List
+from fastapi import Body, Depends, Header, HTTPException, Query, Request, status, APIRouter
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, Field, EmailStr, computed_field
 from pydantic.functional_validators import BeforeValidator
 from typing_extensions import Annotated
 from bson import ObjectId
 from bson.errors import InvalidId
 from pymongo import ReturnDocument
-from config.database import user_collection, article_collection, review_collection, login_collection
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from config.database import CLIENT_OPTIONS, db, pool_stats, user_collection, article_collection, review_collection, login_collection, rating_collection
+from config.database import user_list_collection, article_list_collection, article_search_collection, review_list_collection
+from config.cache import user_cache
+from config.indexes import has_unique_index
+from routes.pagination import fetch_page, keyset_query, keyset_sort, sort_direction
+from routes.streaming import ndjson_response, wants_ndjson
+from routes.ratings import rating_increment, rating_updates, summarize
+from routes.bulk import BulkResult, bulk_insert, read_bulk_items
+from routes.search import article_search
+from routes.matching import user_matcher
+from routes.skills import skill_vocabulary
+from routes.auth import Ownership, TokenModel, admin, create_login, issue_token, ownership, revoke_user
+from routes.projection import computed_fields, parse_fields, projection_for
+from routes.serialization import collection_response, document_response
+from routes.conditional import (
+    PROBE_PROJECTION, conditional_response, document_etag, if_match_versions, last_modified, list_etag, not_modified_response,
+    revalidating, validators,
+)
+from routes.timestamps import UTCDatetime, display_timestamp
+from routes.versioning import stamp, versioned_update
 
 router = APIRouter()
 
 PyObjectId = Annotated[str, BeforeValidator(str)]
 
 
+async def insert_document(collection, model: BaseModel, consistent_read: bool = False, prepare=None):
+    """
+    Inserts a validated model and returns the stored document.
+
+    The document is rebuilt from the model (defaults included) plus the inserted id,
+    so a write costs one round trip; `consistent_read` reads it back from the database.
+    `prepare` is an optional coroutine that rewrites the document before it is stored.
+    """
+    # computed fields are derived on the way out, never stored
+    document = stamp(model.model_dump(by_alias=True, exclude={'id', *computed_fields(type(model))}))
+    if prepare is not None:
+        await prepare(document)
+    result = await collection.insert_one(document)
+    if consistent_read:
+        return await collection.find_one({'_id': result.inserted_id})
+    document['_id'] = result.inserted_id
+    return document
+
+
 # Users
 # ------------------------------------------------------------------
 
 class UserModel(BaseModel):
     id: Optional[PyObjectId] = Field(alias="_id", default=None)
     username: str = Field(...)
-    token: Optional[str] = None
+    # never stored from or returned to clients; sessions live in the auth routes
+    token: Optional[str] = Field(None, exclude=True)
     skills: Optional[list] = Field([])
     interests: Optional[list] = Field([])
+    skill_ids: Optional[List[int]] = None
+    interest_ids: Optional[List[int]] = None
     bio: Optional[str] = None
     email: Optional[EmailStr] = None
     img_url: Optional[str] = Field("https://i.imgur.com/z7eiLjV.png")
+    # maintained by the server on every write
+    version: Optional[int] = None
+    updated_at: Optional[UTCDatetime] = None
+
+class NewUserModel(UserModel):
+    # stored hashed in the logins collection, never with the user
+    password: str = Field(..., min_length=8, exclude=True)
 
 class UpdateUserModel(BaseModel):
     """
@@ -39,68 +88,243 @@ class UpdateUserModel(BaseModel):
 
 class UserCollection(BaseModel):
     users: List[UserModel]
+    missing: Optional[List[str]] = None
+
+class AuthorSummaryModel(BaseModel):
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    username: str
+    img_url: Optional[str] = None
+    bio: Optional[str] = None
+
+class UserMatch(BaseModel):
+    username: str
+    score: int
+    skills: List[str]
+    interests: List[str]
+
+class UserMatchCollection(BaseModel):
+    matches: List[UserMatch]
 
 @router.post('/users',response_description="Add new user",
     response_model=UserModel,
     status_code=status.HTTP_201_CREATED,
     response_model_by_alias=False,)
 
-async def create_user(user: UserModel = Body(...)):
-    new_user = await user_collection.insert_one(
-        user.model_dump(by_alias=True, exclude=['id'])
-    )
-    created_user = await user_collection.find_one(
-        {'_id': new_user.inserted_id}
-    )
+async def create_user(user: NewUserModel = Body(...), consistent_read: bool = False):
+    return await create_account(user, consistent_read)
+
+
+@router.post('/auth/register', response_description="Create a user and sign them in",
+    response_model=TokenModel,
+    status_code=status.HTTP_201_CREATED)
+
+async def register(user: NewUserModel = Body(...)):
+    await create_account(user)
+    return issue_token(user.username)
+
+
+async def create_account(user: NewUserModel, consistent_read: bool = False):
+    """
+    Inserts the user and their login together. A username that is already taken is
+    refused, so nobody can set the password of an account they did not create; that
+    takes the unique username indexes, so sign-up is refused while either is missing.
+    """
+    for collection_name in ("users", "logins"):
+        if not await has_unique_index(collection_name, "username"):
+            raise HTTPException(status_code=503, detail=f"Sign-up is unavailable: {collection_name}.username is not unique-indexed")
+    try:
+        created_user = await insert_document(user_collection, user, consistent_read, skill_vocabulary.canonicalize)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail=f"User {user.username} already exists")
+    try:
+        await create_login(user.username, user.password)
+    except PyMongoError as err:
+        await user_collection.delete_one({"_id": created_user["_id"]})
+        if isinstance(err, DuplicateKeyError):
+            raise HTTPException(status_code=409, detail=f"User {user.username} already exists")
+        raise
+    await user_cache.put(created_user)
+    user_matcher.updated(created_user)
     return created_user
 
 
+# seeding tool: bulk-created users have no login until an operator sets one
+@router.post('/users/bulk', response_description="Add users in bulk", response_model=BulkResult, dependencies=[Depends(admin)])
+async def create_users_bulk(request: Request, ordered: bool = True):
+    result, inserted = await bulk_insert(
+        user_collection, UserModel, await read_bulk_items(request), ordered, skill_vocabulary.canonicalize_many
+    )
+    for user in inserted:
+        user_matcher.updated(user)
+    return result
+
+
+BATCH_LOOKUP_MAX = 500
+
+
+def split_values(values: Optional[str]):
+    return list(dict.fromkeys(value.strip() for value in values.split(",") if value.strip())) if values else []
+
+
+async def lookup_users(key: str, values: list, names: tuple = None):
+    """
+    Resolves users by "_id" or "username", from the cache where possible and with one
+    $in query for the rest. Returns the users in request order and the values not found.
+    Full documents fetched on the way are written to the cache.
+    """
+    get_cached = user_cache.get_by_id if key == "_id" else user_cache.get_by_username
+    if key == "_id":
+        # ids are matched in their canonical lowercase form, as str(ObjectId) gives them back
+        try:
+            values = list(dict.fromkeys(str(ObjectId(value)) for value in values))
+        except InvalidId:
+            raise HTTPException(status_code=400, detail='Invalid id format')
+    found = {}
+    for value in values:
+        if (user := await get_cached(value)) is not None:
+            found[value] = user
+    if misses := [value for value in values if value not in found]:
+        query_values = [ObjectId(value) for value in misses] if key == "_id" else misses
+        projection = {**projection_for(UserModel, names), key: 1} if names else None
+        async for user in user_collection.find({key: {"$in": query_values}}, projection):
+            found[str(user[key])] = user
+            if not names:
+                await user_cache.put(user)
+    return [found[value] for value in values if value in found], [value for value in values if value not in found]
+
+
+def parse_expand(expand: Optional[str], streaming: bool):
+    expansions = set(split_values(expand))
+    if expansions - {"author"}:
+        raise HTTPException(status_code=400, detail=f"Unknown expansion(s): {', '.join(sorted(expansions - {'author'}))}")
+    if expansions and streaming:
+        raise HTTPException(status_code=400, detail='expand is not supported when streaming')
+    return "author" in expansions
+
+
+async def embed_authors(documents: list):
+    """
+    Sets `author` on each document to a summary of the user named by its `username`.
+    Authors are resolved with one batched lookup that reads through the user cache,
+    so a feed page costs at most one extra query however many authors it has.
+    """
+    usernames = list(dict.fromkeys(document["username"] for document in documents if document.get("username")))
+    authors, _ = await lookup_users("username", usernames)
+    # trimmed to AuthorSummaryModel's fields when the response is serialized
+    authors = {author["username"]: author for author in authors}
+    for document in documents:
+        document["author"] = authors.get(document.get("username"))
+    return documents
+
+
 @router.get('/users', response_model=UserCollection,
     response_model_by_alias=False,)
 
-async def list_users():
-    return UserCollection(users=await user_collection.find().to_list(1000))
+async def list_users(
+    request: Request,
+    ids: Optional[str] = None,
+    usernames: Optional[str] = None,
+    fields: Optional[str] = None,
+    stream: bool = False,
+    accept: Optional[str] = Header(None),
+):
+    names = parse_fields(UserModel, fields)
+    if ids or usernames:
+        if ids and usernames:
+            raise HTTPException(status_code=400, detail='Use either ids or usernames')
+        key, values = ("_id", split_values(ids)) if ids else ("username", split_values(usernames))
+        if len(values) > BATCH_LOOKUP_MAX:
+            raise HTTPException(status_code=400, detail=f"At most {BATCH_LOOKUP_MAX} users per lookup")
+        users, missing = await lookup_users(key, values, names)
+        return conditional_response(
+            request, "users", list_etag(request, users),
+            lambda: collection_response(UserModel, names, "users", users, missing=missing),
+        )
+    projection = projection_for(UserModel, names) if names else None
+    if wants_ndjson(stream, accept):
+        return ndjson_response(user_list_collection.find({}, projection), UserModel, names)
+    if revalidating(request):
+        probe = await user_list_collection.find({}, PROBE_PROJECTION).to_list(1000)
+        if (response := not_modified_response(request, "users", list_etag(request, probe))) is not None:
+            return response
+    users = await user_list_collection.find({}, projection).to_list(1000)
+    return conditional_response(
+        request, "users", list_etag(request, users), lambda: collection_response(UserModel, names, "users", users)
+    )
 
 
 @router.get('/users/{id}',response_model=UserModel,
     response_model_by_alias=False)
 
 
-async def show_user(id: str):
+async def show_user(request: Request, id: str, fields: Optional[str] = None):
+    names = parse_fields(UserModel, fields)
     try:
         user_id = ObjectId(id)
     except InvalidId:
         raise HTTPException(status_code=400, detail='Invalid id format')
 
-
-    try:
-        if (user := await user_collection.find_one({"_id": ObjectId(id)})) is not None:
-            return user
-        else:
+    if (user := await user_cache.get_by_id(id)) is None:
+        if (user := await user_collection.find_one({"_id": user_id})) is None:
             raise HTTPException(status_code=404, detail='User not found')
-    except Exception as err:
-        raise HTTPException(status_code=404, detail='User not found')
-    
+        await user_cache.put(user)
+    return conditional_response(
+        request, "users", document_etag(request, user), lambda: document_response(UserModel, names, user),
+        last_modified(user),
+    )
+
 @router.get('/users/username/{username}',response_model=UserModel,
     response_model_by_alias=False)
 
-async def show_user(username: str):
-    try:
-        if (user := await user_collection.find_one({"username": username})) is not None:
-            return user
-        else:
+async def show_user(request: Request, username: str, fields: Optional[str] = None):
+    names = parse_fields(UserModel, fields)
+    if (user := await user_cache.get_by_username(username)) is None:
+        if (user := await user_collection.find_one({"username": username})) is None:
             raise HTTPException(status_code=404, detail='User not found')
-    except Exception as err:
+        await user_cache.put(user)
+    return conditional_response(
+        request, "users", document_etag(request, user), lambda: document_response(UserModel, names, user),
+        last_modified(user),
+    )
+
+@router.get('/users/{username}/matches', response_model=UserMatchCollection,
+    response_description="Users whose skills match this user's interests, or the other way round")
+async def show_user_matches(username: str, limit: int = Query(10, ge=1, le=100)):
+    if (matches := await user_matcher.matches(user_collection, username, limit)) is None:
         raise HTTPException(status_code=404, detail='User not found')
+    return UserMatchCollection(matches=matches)
+
+@router.get('/cache/stats', response_description="User cache counters")
+async def cache_stats():
+    return {"users": user_cache.stats()}
+
+
+@router.get('/health', response_description="Database reachability and connection pool usage")
+async def health():
+    try:
+        await db.command("ping")
+        status_code, database = 200, "ok"
+    except PyMongoError as err:
+        status_code, database = 503, str(err)
+    return JSONResponse(status_code=status_code, content={
+        "database": database,
+        "max_pool_size": CLIENT_OPTIONS["maxPoolSize"],
+        "pools": pool_stats.snapshot(),
+    })
 
 @router.delete("/users/{id}", response_description="Delete a user")
-async def delete_student(id: str):
+async def delete_student(id: str, owner: Ownership = Depends(ownership)):
     try:
-        delete_result = await user_collection.delete_one({"_id": ObjectId(id)})
+        deleted_user = await user_collection.find_one_and_delete(owner.filter({"_id": ObjectId(id)}))
     except Exception:
         raise HTTPException(status_code=400, detail='Invalid id format')
 
-    if delete_result.deleted_count == 1:
+    if deleted_user is not None:
+        await login_collection.delete_one({"username": deleted_user["username"]})
+        # the name can be registered again; tokens issued to this user must not carry over
+        await revoke_user(deleted_user["username"])
+        await user_cache.invalidate(deleted_user)
+        user_matcher.removed(deleted_user["username"])
         return Response(status_code=status.HTTP_204_NO_CONTENT)
 
     raise HTTPException(status_code=404, detail=f"User {id} not found")
@@ -112,21 +336,37 @@ async def delete_student(id: str):
     response_model=UserModel,
     response_model_by_alias=False,
 )
-async def update_student(username: str, user: UpdateUserModel = Body(...)):
+async def update_student(
+    request: Request,
+    username: str,
+    user: UpdateUserModel = Body(...),
+    if_match: Optional[str] = Header(None),
+    owner: Ownership = Depends(ownership),
+):
+    owner.check(username)
     user = {
         k: v for k, v in user.model_dump(by_alias=True).items() if v is not None
     }
 
     if len(user) >= 1:
+        await skill_vocabulary.canonicalize(user)
+        query = {"username": username}
+        if (versions := if_match_versions(if_match)) is not None:
+            query["version"] = {"$in": versions}
         update_result = await user_collection.find_one_and_update(
-            {"username": username},
-            {"$set": user},
+            query,
+            versioned_update(user),
             return_document=ReturnDocument.AFTER,
         )
         if update_result is not None:
-            return update_result
-        else:
-            raise HTTPException(status_code=404, detail=f"User {username} not found")
+            await user_cache.put(update_result)
+            user_matcher.updated(update_result)
+            response = document_response(UserModel, None, update_result)
+            response.headers.update(validators(document_etag(request, update_result), last_modified(update_result)))
+            return response
+        if versions is not None and await user_collection.find_one({"username": username}, {"_id": 1}) is not None:
+            raise HTTPException(status_code=412, detail=f"User {username} has changed")
+        raise HTTPException(status_code=404, detail=f"User {username} not found")
     if len(user) == 0:
         raise HTTPException(status_code=404, detail=f"Bad request")
 
@@ -135,6 +375,13 @@ async def update_student(username: str, user: UpdateUserModel = Body(...)):
  
     raise HTTPException(status_code=404, detail=f"User {username} not found")
 
+class SkillCollection(BaseModel):
+    skills: List[dict]
+
+@router.get('/skills', response_model=SkillCollection, response_description="Autocomplete skill names")
+async def list_skills(prefix: str = "", limit: int = Query(10, ge=1, le=100)):
+    return SkillCollection(skills=await skill_vocabulary.complete(prefix, limit))
+
 # ------------------------------------------------------------------
 
 # Articles
@@ -142,21 +389,33 @@ async def update_student(username: str, user: UpdateUserModel = Body(...)):
 # ------------------------------------------------------------------
 
 
-def get_current_timestamp():
-    return datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+class CreatedAtDisplay(BaseModel):
+    """
+    Adds the `created_at` display string, derived from created_at_sorting (UTC) when
+    the document is serialized instead of being stored next to it.
+    """
+    # stored fields each computed field is derived from, for projections
+    computed_sources: ClassVar[dict] = {"created_at": ("created_at_sorting",)}
 
-def get_current_timestamp_sorting():
-    return datetime.now()
+    @computed_field
+    @property
+    def created_at(self) -> Optional[str]:
+        return display_timestamp(self.created_at_sorting)
 
 
-class ArticleModel(BaseModel):
+class ArticleModel(CreatedAtDisplay):
     id: Optional[PyObjectId] = Field(alias="_id", default=None)
     username: str = Field(...)
     title: str = Field(...)
     topic: str = Field(...)
     body: str = Field(...)
-    created_at: Optional[str] = Field(default_factory=get_current_timestamp)
-    created_at_sorting: Optional[datetime] = Field(default_factory=get_current_timestamp_sorting)
+    # set by the server on insert
+    created_at_sorting: Optional[UTCDatetime] = None
+    version: Optional[int] = None
+    updated_at: Optional[UTCDatetime] = None
+
+class ArticleWithAuthorModel(ArticleModel):
+    author: Optional[AuthorSummaryModel] = None
 
 class UpdateArticleModel(BaseModel):
     title: Optional[str] = None
@@ -165,59 +424,141 @@ class UpdateArticleModel(BaseModel):
 
 class ArticleCollection(BaseModel):
     articles: List[ArticleModel]
+    next_cursor: Optional[str] = None
+
+class ArticleSearchHit(ArticleModel):
+    score: float
+
+class ArticleSearchResults(BaseModel):
+    articles: List[ArticleSearchHit]
+    next_offset: Optional[int] = None
 
 @router.post('/articles',response_description="Add new articles",
     response_model=ArticleModel,
     status_code=status.HTTP_201_CREATED,
     response_model_by_alias=False,)
 
-async def create_article(article: ArticleModel = Body(...)):
-    new_article = await article_collection.insert_one(
-        article.model_dump(by_alias=True, exclude=['id'])
-    )
-    created_article = await article_collection.find_one(
-        {'_id': new_article.inserted_id}
-    )
+async def create_article(
+    article: ArticleModel = Body(...), consistent_read: bool = False, owner: Ownership = Depends(ownership)
+):
+    owner.check(article.username)
+    created_article = await insert_document(article_collection, article, consistent_read)
+    article_search.indexed(created_article)
     return created_article
 
+@router.post('/articles/bulk', response_description="Add articles in bulk", response_model=BulkResult)
+async def create_articles_bulk(request: Request, ordered: bool = True, owner: Ownership = Depends(ownership)):
+    result, inserted = await bulk_insert(
+        article_collection, ArticleModel, await read_bulk_items(request), ordered, owner=owner.username
+    )
+    for article in inserted:
+        article_search.indexed(article)
+    return result
+
+def article_filter(username: List[str], topic: List[str], created_after: datetime, created_before: datetime):
+    query = {}
+    for field, values in (("username", username), ("topic", topic)):
+        if values:
+            query[field] = values[0] if len(values) == 1 else {"$in": values}
+    created_range = {op: value for op, value in (("$gte", created_after), ("$lt", created_before)) if value is not None}
+    if created_range:
+        query["created_at_sorting"] = created_range
+    return query
+
 @router.get('/articles', response_model=ArticleCollection,
     response_model_by_alias=False,)
 
-async def list_articles(sortby: str = "DESC"):
-    if sortby == "DESC":
-        return ArticleCollection(articles=await article_collection.find().sort("created_at_sorting", -1).to_list(1000))
-    elif sortby == "ASC":
-        return ArticleCollection(articles=await article_collection.find().sort("created_at_sorting", 1).to_list(1000))
-    else:
-        raise HTTPException(status_code=400, detail='Invalid param')
+async def list_articles(
+    request: Request,
+    sortby: str = "DESC",
+    username: Optional[List[str]] = Query(None),
+    topic: Optional[List[str]] = Query(None),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
+    stream: bool = False,
+    accept: Optional[str] = Header(None),
+):
+    direction = sort_direction(sortby)
+    names = parse_fields(ArticleModel, fields)
+    with_author = parse_expand(expand, wants_ndjson(stream, accept))
+    query = article_filter(username, topic, created_after, created_before)
+    # the sort key is always projected so the next cursor can be built, and the author to join on
+    projection = {**projection_for(ArticleModel, names), "created_at_sorting": 1, "username": 1} if names else None
+    if wants_ndjson(stream, accept):
+        return ndjson_response(
+            article_list_collection.find(keyset_query(query, cursor, direction), projection).sort(keyset_sort(direction)),
+            ArticleModel,
+            names,
+        )
+    if revalidating(request) and not with_author:
+        # embedded authors have versions of their own, so only plain lists are probed
+        probe, _ = await fetch_page(article_list_collection, query, direction, limit, cursor, PROBE_PROJECTION)
+        if (response := not_modified_response(request, "articles", list_etag(request, probe))) is not None:
+            return response
+    articles, next_cursor = await fetch_page(article_list_collection, query, direction, limit, cursor, projection)
+    model = ArticleModel
+    if with_author:
+        # without fields= every field of the model with the author is serialized, computed ones included
+        names = names + ("author",) if names else None
+        model, articles = ArticleWithAuthorModel, await embed_authors(articles)
+    return conditional_response(
+        request, "articles", list_etag(request, articles),
+        lambda: collection_response(model, names, "articles", articles, next_cursor=next_cursor),
+    )
+
+@router.get('/articles/search', response_model=ArticleSearchResults,
+    response_model_by_alias=False,)
+
+async def search_articles(
+    request: Request,
+    q: str = Query(..., min_length=1),
+    offset: int = Query(0, ge=0, le=1000),
+    limit: int = Query(20, ge=1, le=100),
+    fields: Optional[str] = None,
+):
+    names = parse_fields(ArticleModel, fields)
+    projection = projection_for(ArticleModel, names) if names else None
+    articles, more = await article_search.search(article_search_collection, q, projection, offset, limit)
+    next_offset = offset + limit if more else None
+    names = names + ("score",) if names else None
+    return conditional_response(
+        request, "search", list_etag(request, articles),
+        lambda: collection_response(ArticleSearchHit, names, "articles", articles, next_offset=next_offset),
+    )
 
 @router.get('/articles/{id}',response_model=ArticleModel,
     response_model_by_alias=False)
 
 
-async def show_article(id: str):
+async def show_article(request: Request, id: str, fields: Optional[str] = None):
+    names = parse_fields(ArticleModel, fields)
     try:
         article_id = ObjectId(id)
     except InvalidId:
         raise HTTPException(status_code=400, detail='Invalid id format')
 
-
-    try:
-        if (article := await article_collection.find_one({"_id": ObjectId(id)})) is not None:
-            return article
-        else:
-            raise HTTPException(status_code=404, detail='Article not found')
-    except Exception as err:
+    projection = projection_for(ArticleModel, names) if names else None
+    if (article := await article_collection.find_one({"_id": article_id}, projection)) is None:
         raise HTTPException(status_code=404, detail='Article not found')
+    return conditional_response(
+        request, "articles", document_etag(request, article), lambda: document_response(ArticleModel, names, article),
+        last_modified(article),
+    )
 
 @router.delete("/articles/{id}", response_description="Delete an article")
-async def delete_article(id: str):
+async def delete_article(id: str, owner: Ownership = Depends(ownership)):
     try:
-        delete_result = await article_collection.delete_one({"_id": ObjectId(id)})
+        article_id = ObjectId(id)
+        delete_result = await article_collection.delete_one(owner.filter({"_id": article_id}))
     except Exception:
         raise HTTPException(status_code=400, detail='Invalid article format')
 
     if delete_result.deleted_count == 1:
+        article_search.removed(article_id)
         return Response(status_code=status.HTTP_204_NO_CONTENT)
 
     raise HTTPException(status_code=404, detail=f"Article {id} not found")
@@ -229,24 +570,39 @@ async def delete_article(id: str):
     response_model=ArticleModel,
     response_model_by_alias=False,
 )
-async def update_article(id: str, article: UpdateArticleModel = Body(...)):
+async def update_article(
+    request: Request,
+    id: str,
+    article: UpdateArticleModel = Body(...),
+    if_match: Optional[str] = Header(None),
+    owner: Ownership = Depends(ownership),
+):
     article = {
         k: v for k, v in article.model_dump(by_alias=True).items() if v is not None
     }
 
     if len(article) >= 1:
+        versions = if_match_versions(if_match)
         try:
-            update_result = await article_collection.find_one_and_update(
-                {"_id": ObjectId(id)},
-                {"$set": article},
-                return_document=ReturnDocument.AFTER,
-            )
-        except:
+            query = owner.filter({"_id": ObjectId(id)})
+        except InvalidId:
             raise HTTPException(status_code=404, detail=f"Article id incorrect")
+        if versions is not None:
+            query["version"] = {"$in": versions}
+        update_result = await article_collection.find_one_and_update(
+            query,
+            versioned_update(article),
+            return_document=ReturnDocument.AFTER,
+        )
         if update_result is not None:
-            return update_result
-        else:
-            raise HTTPException(status_code=404, detail=f"article {id} not found")
+            article_search.indexed(update_result)
+            response = document_response(ArticleModel, None, update_result)
+            response.headers.update(validators(document_etag(request, update_result), last_modified(update_result)))
+            return response
+        # only a failed write pays for telling a stale version from a missing article
+        if versions is not None and await article_collection.find_one(owner.filter({"_id": ObjectId(id)}), {"_id": 1}):
+            raise HTTPException(status_code=412, detail=f"article {id} has changed")
+        raise HTTPException(status_code=404, detail=f"article {id} not found")
     if len(article) == 0:
         raise HTTPException(status_code=400, detail=f"Bad request")
 
@@ -257,66 +613,119 @@ async def update_article(id: str, article: UpdateArticleModel = Body(...)):
 
 #---------------------------------------------------
 
-class ReviewModel(BaseModel):
+class ReviewModel(CreatedAtDisplay):
     id: Optional[PyObjectId] = Field(alias="_id", default=None)
     username: str = Field(...)
     created_about: str = Field(...)
     title: str = Field(...)
     body: str = Field(...)
-    rating: int = Field(None, ge=0, le=5)
-    created_at: Optional[str] = Field(default_factory=get_current_timestamp)
-    created_at_sorting: Optional[datetime] = Field(default_factory=get_current_timestamp_sorting)
+    rating: Optional[int] = Field(None, ge=0, le=5)
+    # set by the server on insert
+    created_at_sorting: Optional[UTCDatetime] = None
+    version: Optional[int] = None
+    updated_at: Optional[UTCDatetime] = None
+
+class ReviewWithAuthorModel(ReviewModel):
+    author: Optional[AuthorSummaryModel] = None
 
 class ReviewCollection(BaseModel):
     reviews: List[ReviewModel]
 
+class RatingSummaryModel(BaseModel):
+    username: str
+    count: int
+    average: Optional[float] = None
+    histogram: dict
+
 
 @router.post('/reviews',response_description="Add new review",
     response_model=ReviewModel,
     status_code=status.HTTP_201_CREATED,
     response_model_by_alias=False,)
 
-async def create_review(review: ReviewModel = Body(...)):
-    new_review = await review_collection.insert_one(
-        review.model_dump(by_alias=True, exclude=['id'])
-    )
-    created_review = await review_collection.find_one(
-        {'_id': new_review.inserted_id}
-    )
+async def create_review(
+    review: ReviewModel = Body(...), consistent_read: bool = False, owner: Ownership = Depends(ownership)
+):
+    owner.check(review.username)
+    created_review = await insert_document(review_collection, review, consistent_read)
+    if review.rating is not None:
+        await rating_collection.update_one(
+            {"_id": review.created_about},
+            {"$inc": rating_increment(review.rating)},
+            upsert=True,
+        )
     return created_review
 
 
+@router.post('/reviews/bulk', response_description="Add reviews in bulk", response_model=BulkResult)
+async def create_reviews_bulk(request: Request, ordered: bool = True, owner: Ownership = Depends(ownership)):
+    result, inserted = await bulk_insert(
+        review_collection, ReviewModel, await read_bulk_items(request), ordered, owner=owner.username
+    )
+    if updates := rating_updates(inserted):
+        await rating_collection.bulk_write(updates, ordered=False)
+    return result
+
+
 @router.get('/reviews', response_model=ReviewCollection,
     response_model_by_alias=False,)
 
 
 
-async def list_reviews(sortby: str = "DESC", created_about: str = None):
-    if created_about:
-        print('hello')
-        if sortby == "DESC":
-            return ReviewCollection(reviews=await review_collection.find({'created_about': created_about}).sort("created_at_sorting", -1).to_list(1000))
-        elif sortby == "ASC":
-            return ReviewCollection(reviews=await review_collection.find({'created_about': created_about}).sort("created_at_sorting", 1).to_list(1000))
-        else:
-            raise HTTPException(status_code=400, detail='Invalid param')
-    else:
-        if sortby == "DESC":
-            return ReviewCollection(reviews=await review_collection.find().sort("created_at_sorting", -1).to_list(1000))
-        elif sortby == "ASC":
-            return ReviewCollection(reviews=await review_collection.find().sort("created_at_sorting", 1).to_list(1000))
-        else:
-            raise HTTPException(status_code=400, detail='Invalid param')
-    
+async def list_reviews(
+    request: Request,
+    sortby: str = "DESC",
+    created_about: str = None,
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
+    stream: bool = False,
+    accept: Optional[str] = Header(None),
+):
+    direction = sort_direction(sortby)
+    names = parse_fields(ReviewModel, fields)
+    with_author = parse_expand(expand, wants_ndjson(stream, accept))
+    query = {'created_about': created_about} if created_about else {}
+    projection = {**projection_for(ReviewModel, names), "username": 1} if names else None
+
+    def find_reviews(projection):
+        return review_list_collection.find(query, projection).sort("created_at_sorting", direction)
+
+    if wants_ndjson(stream, accept):
+        return ndjson_response(find_reviews(projection), ReviewModel, names)
+    if revalidating(request) and not with_author:
+        probe = await find_reviews(PROBE_PROJECTION).to_list(1000)
+        if (response := not_modified_response(request, "reviews", list_etag(request, probe))) is not None:
+            return response
+    model, reviews = ReviewModel, await find_reviews(projection).to_list(1000)
+    if with_author:
+        # without fields= every field of the model with the author is serialized, computed ones included
+        names = names + ("author",) if names else None
+        model, reviews = ReviewWithAuthorModel, await embed_authors(reviews)
+    return conditional_response(
+        request, "reviews", list_etag(request, reviews), lambda: collection_response(model, names, "reviews", reviews)
+    )
+
 
 @router.delete("/reviews/{id}", response_description="Delete a review")
-async def delete_review(id: str):
+async def delete_review(id: str, owner: Ownership = Depends(ownership)):
     try:
-        delete_result = await review_collection.delete_one({"_id": ObjectId(id)})
+        deleted_review = await review_collection.find_one_and_delete(
+            owner.filter({"_id": ObjectId(id)}), projection={"created_about": 1, "rating": 1}
+        )
     except Exception:
         raise HTTPException(status_code=400, detail='Invalid id format')
 
-    if delete_result.deleted_count == 1:
+    if deleted_review is not None:
+        if deleted_review.get("rating") is not None:
+            await rating_collection.update_one(
+                {"_id": deleted_review["created_about"]},
+                {"$inc": rating_increment(deleted_review["rating"], -1)},
+            )
         return Response(status_code=status.HTTP_204_NO_CONTENT)
 
     raise HTTPException(status_code=404, detail=f"Review {id} not found")
+
+
+@router.get('/users/{username}/rating', response_model=RatingSummaryModel)
+async def show_user_rating(username: str):
+    return summarize(username, await rating_collection.find_one({"_id": username}))
@@ -0,0 +1,270 @@
+import base64
+import getpass
+import hashlib
+import hmac
+import json
+import sys
+import secrets
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from pydantic import BaseModel, Field
+from decouple import config, Csv
+from config.database import login_collection, run, user_collection
+from config.pubsub import pubsub
+from routes.timestamps import UTCDatetime
+
+router = APIRouter()
+
+SECRET_KEY = config("SECRET_KEY")
+TOKEN_TTL = config("TOKEN_TTL", default=7 * 24 * 3600, cast=int)
+# users allowed to run the admin routes, e.g. seeding users in bulk
+ADMIN_USERNAMES = set(config("ADMIN_USERNAMES", default="", cast=Csv()))
+REVOCATION_CHANNEL = "revocations"
+SCRYPT_PARAMS = {"n": 2 ** 14, "r": 8, "p": 1}
+
+
+class CredentialsModel(BaseModel):
+    username: str
+    password: str = Field(..., min_length=8)
+
+class TokenModel(BaseModel):
+    access_token: str
+    token_type: str = "bearer"
+    expires_at: UTCDatetime
+
+
+# Passwords
+# ------------------------------------------------------------------
+
+def _hash_password(password: str, salt: bytes):
+    digest = hashlib.scrypt(password.encode(), salt=salt, **SCRYPT_PARAMS)
+    return "scrypt${n}${r}${p}$".format(**SCRYPT_PARAMS) + base64.b64encode(salt).decode() + "$" + base64.b64encode(digest).decode()
+
+
+def _verify_password(password: str, password_hash: str):
+    _, n, r, p, salt, digest = password_hash.split("$")
+    candidate = hashlib.scrypt(password.encode(), salt=base64.b64decode(salt), n=int(n), r=int(r), p=int(p))
+    return hmac.compare_digest(candidate, base64.b64decode(digest))
+
+
+async def hash_password(password: str):
+    # scrypt takes tens of milliseconds of CPU; keep it off the event loop
+    return await run_in_threadpool(_hash_password, password, secrets.token_bytes(16))
+
+
+async def verify_password(password: str, password_hash: str):
+    return await run_in_threadpool(_verify_password, password, password_hash)
+
+
+async def create_login(username: str, password: str):
+    """
+    Stores the login of a user being created. Raises DuplicateKeyError when the
+    username already has one; it is never overwritten from the sign-up path.
+    """
+    await login_collection.insert_one({"username": username, "password_hash": await hash_password(password)})
+
+
+async def set_password(username: str, password: str):
+    """
+    Stores the login of a user, replacing any earlier one. Only for the operator reset
+    below, never for an account someone else may already own.
+    """
+    await login_collection.replace_one(
+        {"username": username},
+        {"username": username, "password_hash": await hash_password(password)},
+        upsert=True,
+    )
+
+
+# a real hash to verify against for unknown users, so both paths take the same time
+_UNKNOWN_USER_HASH = _hash_password(secrets.token_urlsafe(), secrets.token_bytes(16))
+
+
+# Tokens
+# ------------------------------------------------------------------
+
+def _b64(raw: bytes):
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _unb64(text: str):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload: str):
+    return _b64(hmac.new(SECRET_KEY.encode(), payload.encode(), hashlib.sha256).digest())
+
+
+def issue_token(username: str):
+    issued = time.time()
+    expires = int(issued) + TOKEN_TTL
+    claims = {"sub": username, "iat": issued, "exp": expires, "jti": secrets.token_hex(8)}
+    payload = _b64(json.dumps(claims, separators=(",", ":")).encode())
+    return TokenModel(
+        access_token=f"{payload}.{_sign(payload)}",
+        expires_at=datetime.fromtimestamp(expires, tz=timezone.utc),
+    )
+
+
+class RevokedTokens:
+    """
+    Bounded LRU of revoked token ids, and of usernames whose tokens issued before a
+    given time are revoked (e.g. because the user was deleted and the name may be taken
+    again). Entries are dropped once the tokens they cover would have expired anyway,
+    so only revocations within TOKEN_TTL need to fit.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def _put(self, key: tuple, expires: float, before: float = None):
+        self._entries[key] = (expires, before)
+        self._entries.move_to_end(key)
+        now = time.time()
+        while self._entries and (len(self._entries) > self.maxsize or next(iter(self._entries.values()))[0] < now):
+            self._entries.popitem(last=False)
+
+    def add(self, jti: str, expires: int):
+        self._put(("jti", jti), expires)
+
+    def add_user(self, username: str, before: float):
+        self._put(("user", username), before + TOKEN_TTL, before)
+
+    def revoked(self, claims: dict):
+        if ("jti", claims["jti"]) in self._entries:
+            return True
+        user = self._entries.get(("user", claims["sub"]))
+        # tokens issued before iat existed count as issued at the epoch
+        return user is not None and claims.get("iat", 0) <= user[1]
+
+
+revoked_tokens = RevokedTokens(maxsize=config("REVOKED_TOKENS_MAX", default=10000, cast=int))
+
+
+async def on_revocation(event: dict):
+    if "jti" in event:
+        revoked_tokens.add(event["jti"], event["exp"])
+    else:
+        revoked_tokens.add_user(event["username"], event["before"])
+
+pubsub.subscribe(REVOCATION_CHANNEL, on_revocation)
+
+
+async def revoke_token(claims: dict):
+    revoked_tokens.add(claims["jti"], claims["exp"])
+    await pubsub.publish(REVOCATION_CHANNEL, {"jti": claims["jti"], "exp": claims["exp"]})
+
+
+async def revoke_user(username: str):
+    """
+    Revokes every token issued to `username` so far, on every worker.
+    """
+    before = time.time()
+    revoked_tokens.add_user(username, before)
+    await pubsub.publish(REVOCATION_CHANNEL, {"username": username, "before": before})
+
+
+def verify_token(token: str):
+    """
+    Returns the token's claims. Needs no database read: the signature, expiry and the
+    in-memory revocation list are all checked locally.
+    """
+    try:
+        payload, signature = token.split(".")
+        # compared as bytes: compare_digest rejects non-ASCII str
+        if not hmac.compare_digest(signature.encode(), _sign(payload).encode()):
+            raise ValueError("bad signature")
+        claims = json.loads(_unb64(payload))
+    except ValueError:
+        raise HTTPException(status_code=401, detail='Invalid token', headers={"WWW-Authenticate": "Bearer"})
+    if claims["exp"] < time.time() or revoked_tokens.revoked(claims):
+        raise HTTPException(status_code=401, detail='Token expired or revoked', headers={"WWW-Authenticate": "Bearer"})
+    return claims
+
+
+def token_claims(authorization: Optional[str] = Header(None)):
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail='Not authenticated', headers={"WWW-Authenticate": "Bearer"})
+    return verify_token(token)
+
+
+def current_user(claims: dict = Depends(token_claims)):
+    return claims["sub"]
+
+
+class Ownership:
+    """
+    Scopes a write to documents owned by the authenticated user.
+
+    The owner is added to the write's own filter, so authorization costs no extra read
+    and leaves no window between check and write; a document that exists but belongs to
+    someone else simply does not match, and the route reports it as not found.
+    """
+
+    def __init__(self, username: str):
+        self.username = username
+
+    def filter(self, query: dict, field: str = "username"):
+        return {**query, field: self.username}
+
+    def check(self, username: str):
+        """
+        For writes that name their owner up front, e.g. in the path or the request body.
+        """
+        if username != self.username:
+            raise HTTPException(status_code=403, detail=f"Not allowed to act as {username}")
+
+
+def ownership(username: str = Depends(current_user)):
+    return Ownership(username)
+
+
+def admin(username: str = Depends(current_user)):
+    if username not in ADMIN_USERNAMES:
+        raise HTTPException(status_code=403, detail='Admins only')
+    return username
+
+
+# Routes
+# ------------------------------------------------------------------
+
+@router.post('/auth/login', response_model=TokenModel)
+async def login(credentials: CredentialsModel = Body(...)):
+    login = await login_collection.find_one({"username": credentials.username})
+    valid = await verify_password(credentials.password, login["password_hash"] if login else _UNKNOWN_USER_HASH)
+    if login is None or not valid:
+        raise HTTPException(status_code=401, detail='Invalid username or password')
+    return issue_token(credentials.username)
+
+
+@router.post('/auth/logout', status_code=status.HTTP_204_NO_CONTENT)
+async def logout(claims: dict = Depends(token_claims)):
+    await revoke_token(claims)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+async def reset_password(username: str):
+    """
+    Operator reset for accounts created before logins existed, or whose owner lost
+    their password.
+    """
+    if await user_collection.find_one({"username": username}, {"_id": 1}) is None:
+        raise SystemExit(f"User {username} not found")
+    password = getpass.getpass(f"New password for {username}: ")
+    if len(password) < 8:
+        raise SystemExit("Passwords need at least 8 characters")
+    await set_password(username, password)
+    print(f"Password set for {username}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        raise SystemExit("usage: python -m routes.auth <username>")
+    run(reset_password, sys.argv[1])
@@ -0,0 +1,110 @@
+import json
+from typing import List, Optional, Type, Union
+from fastapi import HTTPException, Request
+from pydantic import BaseModel, ValidationError
+from pymongo.errors import BulkWriteError
+from decouple import config
+from routes.streaming import NDJSON_MEDIA_TYPE
+from routes.projection import computed_fields
+from routes.versioning import stamp
+
+BULK_MAX_ITEMS = config("BULK_MAX_ITEMS", default=10000, cast=int)
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    error: Optional[Union[str, list]] = None
+
+class BulkResult(BaseModel):
+    inserted: int
+    failed: int
+    results: List[BulkItemResult]
+
+
+async def read_bulk_items(request: Request):
+    """
+    Reads a JSON array body, or one JSON document per line for application/x-ndjson.
+    Unparseable NDJSON lines are kept as errors so they get reported per item.
+    """
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE):
+        items = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as err:
+                items.append(err)
+    else:
+        try:
+            items = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail='Invalid JSON body')
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail='Expected a JSON array')
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ITEMS} items per request")
+    return items
+
+
+async def bulk_insert(
+    collection, model: Type[BaseModel], items: list, ordered: bool = True, prepare=None, owner: str = None
+):
+    """
+    Validates every item with `model` and writes the valid ones with a single insert_many.
+
+    With `ordered`, writing stops at the first invalid or rejected item like Mongo's
+    ordered inserts do, and later items are reported as not attempted. `prepare` is an
+    optional coroutine that rewrites the list of valid documents before they are stored.
+    With `owner`, items whose username is someone else's are rejected.
+    Returns the BulkResult and the documents that were inserted.
+    """
+    results = [BulkItemResult(index=index) for index in range(len(items))]
+    stored_exclude = {'id', *computed_fields(model)}
+    documents, positions = [], []
+    for index, item in enumerate(items):
+        try:
+            if isinstance(item, Exception):
+                raise ValueError(f"Invalid JSON: {item}")
+            document = stamp(model.model_validate(item).model_dump(by_alias=True, exclude=stored_exclude))
+            if owner is not None and document.get("username") != owner:
+                raise ValueError(f"Not allowed to act as {document.get('username')}")
+        except ValidationError as err:
+            results[index].error = err.errors(include_url=False, include_context=False)
+        except ValueError as err:
+            results[index].error = str(err)
+        else:
+            documents.append(document)
+            positions.append(index)
+            continue
+        if ordered:
+            break
+
+    if prepare is not None and documents:
+        await prepare(documents)
+
+    failed_at = {}
+    if documents:
+        try:
+            await collection.insert_many(documents, ordered=ordered)
+        except BulkWriteError as err:
+            failed_at = {error["index"]: error["errmsg"] for error in err.details["writeErrors"]}
+
+    stopped = False
+    inserted = []
+    for offset, (index, document) in enumerate(zip(positions, documents)):
+        if stopped:
+            results[index].error = "Not attempted"
+        elif offset in failed_at:
+            results[index].error = failed_at[offset]
+            stopped = ordered
+        else:
+            results[index].id = str(document["_id"])
+            inserted.append(document)
+    for result in results:
+        if result.id is None and result.error is None:
+            result.error = "Not attempted"
+
+    return BulkResult(inserted=len(inserted), failed=len(items) - len(inserted), results=results), inserted
@@ -0,0 +1,133 @@
+import hashlib
+import re
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+import bson
+from decouple import config
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+
+# Cache-Control per route group, e.g. CACHE_CONTROL_ARTICLES="public, max-age=30";
+# the default lets clients keep responses but revalidate them with their ETag
+CACHE_CONTROL = {
+    group: config(f"CACHE_CONTROL_{group.upper()}", default="no-cache")
+    for group in ("users", "articles", "reviews", "search")
+}
+# enough of a stored document to compute its ETag (plus the list sort key for cursors)
+PROBE_PROJECTION = {"version": 1, "created_at_sorting": 1}
+VERSION_TAG = re.compile(r'^"v(\d+)(?:-[0-9a-f]+)?"$')
+
+
+def _digest(*parts: bytes):
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def _fingerprint(document: dict):
+    """
+    A document's version where it has one; documents written before versions existed
+    are hashed whole. An embedded author counts as part of the document.
+    """
+    if document.get("version") is None:
+        return bson.encode(document)
+    fingerprint = f'{document["_id"]}.{document["version"]};'.encode()
+    if author := document.get("author"):
+        fingerprint += _fingerprint(author)
+    return fingerprint
+
+
+def document_etag(request: Request, document: dict):
+    """
+    Strong ETag `"v<version>"` of a single document, suffixed with a digest of the
+    query string when that shapes the representation (e.g. `fields=`).
+    """
+    if document.get("version") is None:
+        return f'W/"{_digest(request.url.query.encode(), bson.encode(document))}"'
+    suffix = f"-{_digest(request.url.query.encode())}" if request.url.query else ""
+    return f'"v{document["version"]}{suffix}"'
+
+
+def list_etag(request: Request, documents: list):
+    """
+    Weak ETag over the versions of the documents behind a list and the query string
+    that selected them, so it can be computed before (and instead of) serializing the body.
+    """
+    return f'W/"{_digest(request.url.query.encode(), *map(_fingerprint, documents))}"'
+
+
+def last_modified(document: dict):
+    """
+    When a single document last changed, to the second: its last write, or its creation
+    for documents written before updated_at existed. Lists get no Last-Modified, as
+    deleting one of their documents moves no remaining document's time.
+    """
+    modified = document.get("updated_at") or document.get("created_at_sorting")
+    if modified is None:
+        return None
+    if modified.tzinfo is None:
+        # stored times are naive UTC
+        modified = modified.replace(tzinfo=timezone.utc)
+    return modified.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def validators(etag: str, modified=None):
+    headers = {"ETag": etag}
+    if modified is not None:
+        headers["Last-Modified"] = format_datetime(modified, usegmt=True)
+    return headers
+
+
+def revalidating(request: Request):
+    return request.headers.get("if-none-match") is not None
+
+
+def not_modified(request: Request, etag: str, modified=None):
+    header = request.headers.get("if-none-match")
+    if header is not None:
+        # If-None-Match uses the weak comparison: W/ prefixes are ignored
+        tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+    # If-Modified-Since only counts without If-None-Match; an unparsable date is ignored
+    since = request.headers.get("if-modified-since")
+    if since is None or modified is None:
+        return False
+    try:
+        return modified <= parsedate_to_datetime(since)
+    except (TypeError, ValueError):
+        return False
+
+
+def not_modified_response(request: Request, group: str, etag: str, modified=None):
+    if not_modified(request, etag, modified):
+        return Response(status_code=304, headers={**validators(etag, modified), "Cache-Control": CACHE_CONTROL[group]})
+    return None
+
+
+def conditional_response(request: Request, group: str, etag: str, respond, modified=None):
+    """
+    Answers 304 Not Modified when the client already holds the representation tagged
+    `etag` (or, for single documents, last `modified` no later than If-Modified-Since);
+    otherwise builds the response with `respond()`. Both carry the validators and the
+    group's Cache-Control.
+    """
+    if (response := not_modified_response(request, group, etag, modified)) is not None:
+        return response
+    response = respond()
+    response.headers.update({**validators(etag, modified), "Cache-Control": CACHE_CONTROL[group]})
+    return response
+
+
+def if_match_versions(if_match: Optional[str]):
+    """
+    Versions accepted by an If-Match header, to be added to the write's filter; None
+    when any version will do. Raises 412 when none of the tags is one of our versions.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    versions = [int(match.group(1)) for tag in if_match.split(",") if (match := VERSION_TAG.match(tag.strip()))]
+    if not versions:
+        raise HTTPException(status_code=412, detail='If-Match does not name a version')
+    return versions
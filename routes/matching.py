@@ -0,0 +1,153 @@
+import asyncio
+import heapq
+import time
+from collections import defaultdict
+from decouple import config
+from routes.skills import canonical_term, display_term
+
+MATCH_PROJECTION = {"username": 1, "skills": 1, "interests": 1, "skill_ids": 1, "interest_ids": 1}
+
+
+def normalize_terms(values):
+    return {term for term in map(canonical_term, values or []) if term}
+
+
+def term_displays(values):
+    """
+    Canonical term -> display string for stored skills/interests, which are the
+    vocabulary's display strings for users written since terms were canonicalised.
+    """
+    return {canonical_term(value): display_term(value) for value in values or [] if canonical_term(value)}
+
+
+class MatchIndex:
+    """
+    Inverted index from skill/interest terms to usernames.
+
+    A user's matches are the users whose skills overlap the user's interests or whose
+    interests overlap the user's skills; only the postings of the user's own terms are
+    visited, so a lookup does not depend on the total number of users.
+    """
+
+    def __init__(self):
+        self.skills = defaultdict(set)
+        self.interests = defaultdict(set)
+        self.profiles = {}
+        self.displays = {}
+
+    def add(self, user: dict):
+        self.remove(user["username"])
+        # the first spelling seen wins, like the vocabulary's
+        for field in ("skills", "interests"):
+            for term, display in term_displays(user.get(field)).items():
+                self.displays.setdefault(term, display)
+        skills, interests = normalize_terms(user.get("skills")), normalize_terms(user.get("interests"))
+        for term in skills:
+            self.skills[term].add(user["username"])
+        for term in interests:
+            self.interests[term].add(user["username"])
+        self.profiles[user["username"]] = (skills, interests)
+
+    def remove(self, username: str):
+        skills, interests = self.profiles.pop(username, ((), ()))
+        for postings, terms in ((self.skills, skills), (self.interests, interests)):
+            for term in terms:
+                postings[term].discard(username)
+                if not postings[term]:
+                    del postings[term]
+
+    def matches(self, username: str, limit: int):
+        skills, interests = self.profiles[username]
+        offers, wants = defaultdict(list), defaultdict(list)
+        for term in interests:
+            for other in self.skills.get(term, ()):
+                offers[other].append(term)
+        for term in skills:
+            for other in self.interests.get(term, ()):
+                wants[other].append(term)
+        candidates = (offers.keys() | wants.keys()) - {username}
+        best = heapq.nsmallest(
+            limit, candidates, key=lambda other: (-(len(offers[other]) + len(wants[other])), other)
+        )
+        return [
+            {
+                "username": other,
+                "score": len(offers[other]) + len(wants[other]),
+                "skills": sorted(self.displays.get(term, term) for term in offers[other]),
+                "interests": sorted(self.displays.get(term, term) for term in wants[other]),
+            }
+            for other in best
+        ]
+
+
+async def query_matches(collection, username: str, limit: int):
+    """
+    Computes matches straight from the multikey skill_ids/interest_ids indexes, for
+    deployments that disable the in-process index.
+    """
+    user = await collection.find_one({"username": username}, MATCH_PROJECTION)
+    if user is None:
+        return None
+    index = MatchIndex()
+    index.add(user)
+    candidates = collection.find(
+        {"$or": [{"skill_ids": {"$in": user.get("interest_ids") or []}}, {"interest_ids": {"$in": user.get("skill_ids") or []}}]},
+        MATCH_PROJECTION,
+    )
+    async for candidate in candidates:
+        index.add(candidate)
+    return index.matches(username, limit)
+
+
+class UserMatcher:
+    """
+    Keeps a MatchIndex for this worker. The index is built from the users collection on
+    first use, kept current by this worker's writes, and rebuilt after `ttl` seconds to
+    pick up writes made by other workers. When disabled, every lookup goes to query_matches.
+    """
+
+    def __init__(self, ttl: float = 300, enabled: bool = True):
+        self.ttl = ttl
+        self.enabled = enabled
+        self.index = None
+        self.built_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def _ensure_index(self, collection):
+        if self.index is not None and time.monotonic() - self.built_at < self.ttl:
+            return self.index
+        async with self._lock:
+            if self.index is None or time.monotonic() - self.built_at >= self.ttl:
+                index = MatchIndex()
+                async for user in collection.find({}, MATCH_PROJECTION):
+                    index.add(user)
+                self.index, self.built_at = index, time.monotonic()
+        return self.index
+
+    async def matches(self, collection, username: str, limit: int):
+        """
+        Returns the top `limit` matches for `username`, or None if the user does not exist.
+        """
+        if not self.enabled:
+            return await query_matches(collection, username, limit)
+        index = await self._ensure_index(collection)
+        if username not in index.profiles:
+            # possibly created by another worker since the last rebuild
+            if (user := await collection.find_one({"username": username}, MATCH_PROJECTION)) is None:
+                return None
+            index.add(user)
+        return index.matches(username, limit)
+
+    def updated(self, user: dict):
+        if self.index is not None:
+            self.index.add(user)
+
+    def removed(self, username: str):
+        if self.index is not None:
+            self.index.remove(username)
+
+
+user_matcher = UserMatcher(
+    ttl=config("MATCH_INDEX_TTL", default=300, cast=float),
+    enabled=config("MATCH_INDEX", default=True, cast=bool),
+)
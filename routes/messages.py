@@ -0,0 +1,270 @@
+import asyncio
+import json
+from typing import Optional, List
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from pydantic import BaseModel, Field, ValidationError
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument, UpdateOne
+from config.database import conversation_collection, inbox_collection, message_collection
+from config.cache import InMemoryCache
+from config.pubsub import pubsub
+from routes.app import PyObjectId
+from routes.timestamps import UTCDatetime, get_current_timestamp_sorting
+from routes.pagination import fetch_page
+from routes.serialization import collection_response
+from routes.auth import Ownership, current_user, ownership, verify_token
+
+router = APIRouter()
+
+MESSAGE_CHANNEL = "messages"
+PREVIEW_LENGTH = 140
+
+
+class ConversationModel(BaseModel):
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    participants: List[str] = Field(..., min_length=2)
+    created_at: Optional[UTCDatetime] = None
+
+class MessageModel(BaseModel):
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    conversation_id: str
+    sender: str
+    body: str = Field(..., min_length=1)
+    sent_at: Optional[UTCDatetime] = None
+
+class NewMessageModel(BaseModel):
+    # defaults to the authenticated user
+    sender: Optional[str] = None
+    body: str = Field(..., min_length=1)
+
+class MessageCollection(BaseModel):
+    messages: List[MessageModel]
+    next_cursor: Optional[str] = None
+
+class MessagePreviewModel(BaseModel):
+    sender: str
+    body: str
+    sent_at: UTCDatetime
+
+class ConversationSummaryModel(BaseModel):
+    conversation_id: str
+    participants: List[str]
+    last_message: Optional[MessagePreviewModel] = None
+    last_sent_at: Optional[UTCDatetime] = None
+    unread: int = 0
+
+class InboxModel(BaseModel):
+    conversations: List[ConversationSummaryModel]
+    next_cursor: Optional[str] = None
+
+
+class ConnectionRegistry:
+    """
+    Open sockets of this worker, by username. Idle sockets cost a set entry and the
+    receive loop of their endpoint; nothing else runs per connection.
+    """
+
+    def __init__(self):
+        self.sockets = {}
+
+    def connect(self, username: str, websocket: WebSocket):
+        self.sockets.setdefault(username, set()).add(websocket)
+
+    def disconnect(self, username: str, websocket: WebSocket):
+        if (sockets := self.sockets.get(username)) is not None:
+            sockets.discard(websocket)
+            if not sockets:
+                del self.sockets[username]
+
+    async def deliver(self, usernames: list, payload: dict):
+        """
+        Sends `payload` to every local socket of `usernames`, encoding it once.
+        """
+        targets = [(username, websocket) for username in usernames for websocket in self.sockets.get(username, ())]
+        if not targets:
+            return
+        text = json.dumps(payload)
+        results = await asyncio.gather(*(websocket.send_text(text) for _, websocket in targets), return_exceptions=True)
+        for (username, websocket), result in zip(targets, results):
+            if isinstance(result, Exception):
+                self.disconnect(username, websocket)
+
+    def __len__(self):
+        return sum(len(sockets) for sockets in self.sockets.values())
+
+
+connections = ConnectionRegistry()
+# participants never change, so conversations can be cached for a long time
+conversation_cache = InMemoryCache(maxsize=10000, ttl=3600)
+
+
+async def on_message(event: dict):
+    await connections.deliver(event["recipients"], {"type": "message", "message": event["message"]})
+
+pubsub.subscribe(MESSAGE_CHANNEL, on_message)
+
+
+async def get_conversation(conversation_id: str):
+    if (conversation := await conversation_cache.get(conversation_id)) is not None:
+        return conversation
+    try:
+        conversation = await conversation_collection.find_one({"_id": ObjectId(conversation_id)})
+    except InvalidId:
+        raise HTTPException(status_code=400, detail='Invalid id format')
+    if conversation is None:
+        raise HTTPException(status_code=404, detail=f"Conversation {conversation_id} not found")
+    await conversation_cache.set(conversation_id, conversation)
+    return conversation
+
+
+async def update_inbox(conversation: dict, message: dict):
+    """
+    Moves the conversation to the top of each participant's inbox with a preview of
+    `message`, counting it as unread for everyone but the sender, all in a single bulk
+    write. The unread count changes unconditionally; the preview only replaces an older
+    one, so a send that lands after a later one does not roll the inbox back.
+    """
+    preview = {"sender": message["sender"], "body": message["body"][:PREVIEW_LENGTH], "sent_at": message["sent_at"]}
+    newer = {"$or": [{"last_sent_at": {"$lt": message["sent_at"]}}, {"last_sent_at": {"$exists": False}}]}
+    requests = []
+    for username in conversation["participants"]:
+        inbox = {"username": username, "conversation_id": message["conversation_id"]}
+        requests += [
+            UpdateOne(
+                inbox,
+                {"$set": {"participants": conversation["participants"], "unread": 0}} if username == message["sender"]
+                else {"$set": {"participants": conversation["participants"]}, "$inc": {"unread": 1}},
+                upsert=True,
+            ),
+            UpdateOne({**inbox, **newer}, {"$set": {"last_message": preview, "last_sent_at": message["sent_at"]}}),
+        ]
+    # ordered, so each preview is applied after the upsert that creates its document
+    await inbox_collection.bulk_write(requests)
+
+
+async def send_message(conversation_id: str, sender: str, body: str):
+    """
+    Stores a message and publishes it to every worker holding a participant's socket.
+    """
+    conversation = await get_conversation(conversation_id)
+    if sender not in conversation["participants"]:
+        raise HTTPException(status_code=403, detail=f"{sender} is not part of this conversation")
+    message = MessageModel(conversation_id=conversation_id, sender=sender, body=body, sent_at=get_current_timestamp_sorting())
+    document = message.model_dump(by_alias=True, exclude=['id'])
+    document['_id'] = (await message_collection.insert_one(document)).inserted_id
+    await update_inbox(conversation, document)
+    await pubsub.publish(MESSAGE_CHANNEL, {
+        "recipients": conversation["participants"],
+        "message": MessageModel.model_validate(document).model_dump(mode="json"),
+    })
+    return document
+
+
+@router.post('/conversations', response_description="Start (or reopen) a conversation",
+    response_model=ConversationModel,
+    response_model_by_alias=False,)
+
+async def create_conversation(conversation: ConversationModel = Body(...), username: str = Depends(current_user)):
+    participants = sorted(set(conversation.participants))
+    if len(participants) < 2:
+        raise HTTPException(status_code=400, detail='A conversation needs at least two participants')
+    if username not in participants:
+        raise HTTPException(status_code=403, detail=f"{username} is not part of this conversation")
+    return await conversation_collection.find_one_and_update(
+        {"key": "|".join(participants)},
+        {"$setOnInsert": {"participants": participants, "created_at": get_current_timestamp_sorting()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+@router.get('/conversations/{id}/messages', response_model=MessageCollection,
+    response_model_by_alias=False,)
+
+async def list_messages(
+    id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    username: str = Depends(current_user),
+):
+    if username not in (await get_conversation(id))["participants"]:
+        raise HTTPException(status_code=403, detail=f"{username} is not part of this conversation")
+    messages, next_cursor = await fetch_page(
+        message_collection, {"conversation_id": id}, -1, limit, cursor, sort_field="sent_at"
+    )
+    return collection_response(MessageModel, None, "messages", messages, next_cursor=next_cursor)
+
+
+@router.post('/conversations/{id}/messages', response_description="Send a message",
+    response_model=MessageModel,
+    status_code=status.HTTP_201_CREATED,
+    response_model_by_alias=False,)
+
+async def create_message(id: str, message: NewMessageModel = Body(...), owner: Ownership = Depends(ownership)):
+    owner.check(message.sender or owner.username)
+    return await send_message(id, owner.username, message.body)
+
+
+@router.post('/conversations/{id}/read', response_description="Mark a conversation as read",
+    response_model=ConversationSummaryModel)
+
+async def read_conversation(id: str, owner: Ownership = Depends(ownership)):
+    summary = await inbox_collection.find_one_and_update(
+        owner.filter({"conversation_id": id}),
+        {"$set": {"unread": 0, "last_read_at": get_current_timestamp_sorting()}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"Conversation {id} not found")
+    return summary
+
+
+@router.get('/users/{username}/conversations', response_model=InboxModel,
+    response_description="Conversations of a user, most recently active first")
+
+async def list_conversations(
+    username: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    owner: Ownership = Depends(ownership),
+):
+    owner.check(username)
+    conversations, next_cursor = await fetch_page(
+        inbox_collection, {"username": username}, -1, limit, cursor, sort_field="last_sent_at"
+    )
+    return collection_response(ConversationSummaryModel, None, "conversations", conversations, next_cursor=next_cursor)
+
+
+@router.websocket('/ws/{username}')
+async def message_socket(websocket: WebSocket, username: str, token: str = ""):
+    """
+    Pushes {"type": "message", ...} events for the user's conversations and accepts
+    {"conversation_id": ..., "body": ...} frames to send messages. Browsers cannot set
+    headers on a WebSocket, so the session token comes in the `token` query parameter.
+    """
+    try:
+        if verify_token(token)["sub"] != username:
+            raise HTTPException(status_code=403)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    connections.connect(username, websocket)
+    try:
+        while True:
+            frame = await websocket.receive_text()
+            try:
+                frame = json.loads(frame)
+                message = NewMessageModel(sender=username, body=frame.get("body"))
+                await send_message(str(frame.get("conversation_id")), message.sender, message.body)
+            except HTTPException as err:
+                await websocket.send_json({"type": "error", "detail": err.detail})
+            except ValidationError as err:
+                await websocket.send_json({"type": "error", "detail": err.errors(include_url=False, include_context=False)})
+            except (ValueError, AttributeError):
+                await websocket.send_json({"type": "error", "detail": "Invalid frame"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        connections.disconnect(username, websocket)
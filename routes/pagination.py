@@ -0,0 +1,82 @@
+import base64
+import json
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+
+SORT_DIRECTIONS = {"DESC": -1, "ASC": 1}
+SORT_FIELD = "created_at_sorting"
+
+
+def sort_direction(sortby: str):
+    if sortby not in SORT_DIRECTIONS:
+        raise HTTPException(status_code=400, detail='Invalid param')
+    return SORT_DIRECTIONS[sortby]
+
+
+def encode_cursor(doc, sort_field: str = SORT_FIELD):
+    """
+    Opaque cursor pointing just past `doc` in (sort_field, _id) order.
+    """
+    payload = {"s": doc[sort_field].isoformat(), "id": str(doc["_id"])}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        return datetime.fromisoformat(payload["s"]), ObjectId(payload["id"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+
+
+def keyset_sort(direction: int, sort_field: str = SORT_FIELD):
+    return [(sort_field, direction), ("_id", direction)]
+
+
+def keyset_filter(cursor: str, direction: int, sort_field: str = SORT_FIELD):
+    last_value, last_id = decode_cursor(cursor)
+    op = "$lt" if direction == -1 else "$gt"
+    return {"$or": [
+        {sort_field: {op: last_value}},
+        {sort_field: last_value, "_id": {op: last_id}},
+    ]}
+
+
+def keyset_query(query: dict, cursor: str, direction: int, sort_field: str = SORT_FIELD):
+    """
+    `query` narrowed to the documents after `cursor`. Documents without a sort key have
+    no place in the keyset order (and no cursor), so pages leave them out; the
+    `*_created_at_sorting` migrations give legacy documents one.
+    """
+    conditions = [query] if query else []
+    conditions.append({sort_field: {"$ne": None}})
+    if cursor:
+        conditions.append(keyset_filter(cursor, direction, sort_field))
+    return {"$and": conditions} if len(conditions) > 1 else conditions[0]
+
+
+async def fetch_page(
+    collection,
+    query: dict,
+    direction: int,
+    limit: int,
+    cursor: str = None,
+    projection: dict = None,
+    sort_field: str = SORT_FIELD,
+):
+    """
+    Returns one page of documents plus the cursor for the next page (None on the last page).
+
+    One extra document is read to tell whether another page exists, so the
+    caller never has to count the collection.
+    """
+    query = keyset_query(query, cursor, direction, sort_field)
+    docs = await collection.find(query, projection).sort(keyset_sort(direction, sort_field)).limit(limit + 1).to_list(limit + 1)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        return docs, encode_cursor(docs[-1], sort_field)
+    return docs, None
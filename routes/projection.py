@@ -0,0 +1,38 @@
+from typing import Optional, Type
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+
+def computed_fields(model: Type[BaseModel]):
+    """
+    The model's computed fields by name (pydantic 2.4 only exposes them on instances).
+    """
+    return {name: decorator.info for name, decorator in model.__pydantic_decorators__.computed_fields.items()}
+
+
+def parse_fields(model: Type[BaseModel], fields: Optional[str]):
+    """
+    Validates a comma separated `fields=` parameter against the model.
+    Returns the selected field names in model order (always including `id`), or None.
+    """
+    if not fields:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    public = {name for name, field in model.model_fields.items() if not field.exclude} | set(computed_fields(model))
+    unknown = sorted(requested - public)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown field(s): {', '.join(unknown)}")
+    return tuple(name for name in (*model.model_fields, *computed_fields(model)) if name in requested or name == "id")
+
+
+def projection_for(model: Type[BaseModel], names: tuple):
+    # the version and last write are always read, responses are tagged with them
+    projection = {"version": 1, "updated_at": 1}
+    sources = getattr(model, "computed_sources", {})
+    for name in names:
+        if name in model.model_fields:
+            projection[model.model_fields[name].alias or name] = 1
+        else:
+            projection.update(dict.fromkeys(sources[name], 1))
+    return projection
+
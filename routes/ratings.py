@@ -0,0 +1,61 @@
+from pymongo import UpdateOne
+from config.database import review_collection, run
+
+STARS = range(0, 6)
+
+
+def rating_increment(rating: int, sign: int = 1):
+    """
+    $inc document adding (sign=1) or removing (sign=-1) one review from a rating summary.
+    """
+    return {"count": sign, "sum": sign * rating, f"histogram.{rating}": sign}
+
+
+def rating_updates(reviews: list, sign: int = 1):
+    """
+    One upserting UpdateOne per reviewed user, folding the increments of all `reviews`.
+    """
+    increments = {}
+    for review in reviews:
+        if review.get("rating") is None:
+            continue
+        inc = increments.setdefault(review["created_about"], {})
+        for key, value in rating_increment(review["rating"], sign).items():
+            inc[key] = inc.get(key, 0) + value
+    return [UpdateOne({"_id": username}, {"$inc": inc}, upsert=True) for username, inc in increments.items()]
+
+
+def summarize(username: str, summary: dict = None):
+    summary = summary or {}
+    count = summary.get("count", 0)
+    histogram = {str(star): 0 for star in STARS}
+    histogram.update(summary.get("histogram", {}))
+    return {
+        "username": username,
+        "count": count,
+        "average": summary.get("sum", 0) / count if count else None,
+        "histogram": histogram,
+    }
+
+
+async def rebuild_rating_summaries():
+    """
+    Recomputes every summary from the reviews collection and swaps the result in with $out.
+    Needed once for reviews written before summaries were maintained.
+    """
+    await review_collection.aggregate([
+        {"$match": {"rating": {"$ne": None}}},
+        {"$group": {"_id": {"username": "$created_about", "rating": "$rating"}, "n": {"$sum": 1}}},
+        {"$group": {
+            "_id": "$_id.username",
+            "count": {"$sum": "$n"},
+            "sum": {"$sum": {"$multiply": ["$_id.rating", "$n"]}},
+            "stars": {"$push": {"k": {"$toString": "$_id.rating"}, "v": "$n"}},
+        }},
+        {"$project": {"count": 1, "sum": 1, "histogram": {"$arrayToObject": "$stars"}}},
+        {"$out": "ratings"},
+    ]).to_list(None)
+
+
+if __name__ == "__main__":
+    run(rebuild_rating_summaries)
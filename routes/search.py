@@ -0,0 +1,104 @@
+import math
+import re
+from collections import defaultdict
+from decouple import config
+from config.indexes import ARTICLE_TEXT_WEIGHTS as SEARCH_FIELDS
+
+TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str):
+    return TOKEN.findall(text.lower()) if text else []
+
+
+class InvertedIndex:
+    """
+    In-process full-text index over SEARCH_FIELDS, scoring documents like a weighted
+    tf-idf. Used when no MongoDB text index is available (e.g. against a mock backend).
+    """
+
+    def __init__(self, weights: dict = SEARCH_FIELDS):
+        self.weights = weights
+        self.postings = defaultdict(dict)
+        self.terms = {}
+
+    def add(self, doc_id, document: dict):
+        self.remove(doc_id)
+        frequencies = defaultdict(float)
+        for field, weight in self.weights.items():
+            for term in tokenize(document.get(field)):
+                frequencies[term] += weight
+        for term, frequency in frequencies.items():
+            self.postings[term][doc_id] = frequency
+        self.terms[doc_id] = set(frequencies)
+
+    def remove(self, doc_id):
+        for term in self.terms.pop(doc_id, ()):
+            self.postings[term].pop(doc_id, None)
+            if not self.postings[term]:
+                del self.postings[term]
+
+    def search(self, query: str):
+        """
+        Returns (doc_id, score) pairs matching any query term, best first.
+        """
+        scores = defaultdict(float)
+        total = len(self.terms)
+        for term in set(tokenize(query)):
+            matches = self.postings.get(term)
+            if not matches:
+                continue
+            idf = math.log(1 + total / len(matches))
+            for doc_id, frequency in matches.items():
+                scores[doc_id] += frequency * idf
+        return sorted(scores.items(), key=lambda item: (-item[1], str(item[0])))
+
+
+class ArticleSearch:
+    """
+    Relevance-ranked article search backed by the `article_text` index, or by an
+    InvertedIndex built lazily from the collection when `backend` is "memory".
+    """
+
+    def __init__(self, backend: str = "mongo"):
+        self.backend = backend
+        self.index = None
+
+    async def search(self, collection, query: str, projection: dict, offset: int, limit: int):
+        """
+        Returns up to `limit` documents (each with a `score`) after skipping `offset`,
+        plus whether more results follow.
+        """
+        if self.backend == "memory":
+            return await self._search_memory(collection, query, projection, offset, limit)
+        score = {"score": {"$meta": "textScore"}}
+        documents = await collection.find(
+            {"$text": {"$search": query}}, {**(projection or {}), **score}
+        ).sort([("score", {"$meta": "textScore"})]).skip(offset).limit(limit + 1).to_list(limit + 1)
+        return documents[:limit], len(documents) > limit
+
+    async def _search_memory(self, collection, query, projection, offset, limit):
+        if self.index is None:
+            index = InvertedIndex()
+            async for article in collection.find({}, {field: 1 for field in SEARCH_FIELDS}):
+                index.add(article["_id"], article)
+            self.index = index
+        ranked = self.index.search(query)
+        page = dict(ranked[offset:offset + limit])
+        documents = await collection.find({"_id": {"$in": list(page)}}, projection).to_list(None)
+        position = {doc_id: rank for rank, doc_id in enumerate(page)}
+        for document in documents:
+            document["score"] = page[document["_id"]]
+        documents.sort(key=lambda document: position[document["_id"]])
+        return documents, len(ranked) > offset + limit
+
+    def indexed(self, article: dict):
+        if self.index is not None:
+            self.index.add(article["_id"], article)
+
+    def removed(self, article_id):
+        if self.index is not None:
+            self.index.remove(article_id)
+
+
+article_search = ArticleSearch(config("SEARCH_BACKEND", default="mongo"))
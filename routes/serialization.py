@@ -0,0 +1,93 @@
+from functools import lru_cache
+from typing import Optional, Type, get_args
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+from routes.projection import computed_fields
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def dumps(content):
+    """
+    Encodes straight to bytes. Stored datetimes are naive UTC and are written as ISO 8601
+    with a +00:00 offset, matching UTCDatetime fields on the pydantic path.
+    """
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NAIVE_UTC)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content):
+        return dumps(content)
+
+
+class _Stored:
+    """
+    Attribute access to a stored document by field name, for computed fields.
+    """
+
+    __slots__ = ("document", "keys")
+
+    def __init__(self, document: dict, keys: dict):
+        self.document = document
+        self.keys = keys
+
+    def __getattr__(self, name):
+        return self.document.get(self.keys.get(name, name))
+
+
+def _nested_model(annotation):
+    for candidate in (annotation, *get_args(annotation)):
+        if isinstance(candidate, type) and issubclass(candidate, BaseModel):
+            return candidate
+    return None
+
+
+@lru_cache(maxsize=256)
+def compile_serializer(model: Type[BaseModel], names: Optional[tuple] = None):
+    """
+    Returns a function that shapes a stored document the way `model` (or only its fields
+    in `names`) dumps it: public field names, defaults for absent fields, excluded fields
+    dropped, computed fields derived. Documents come from our own writes, so they are
+    trusted rather than validated a second time, and BSON values are left for `dumps` to
+    encode in the same pass.
+    """
+    plan = []
+    for name, field in model.model_fields.items():
+        if field.exclude or (names is not None and name not in names):
+            continue
+        default = None if field.default is PydanticUndefined else field.default
+        nested = _nested_model(field.annotation)
+        plan.append((name, field.alias or name, default, compile_serializer(nested) if nested else None))
+    keys = {name: field.alias or name for name, field in model.model_fields.items()}
+    computed = [
+        (name, field.wrapped_property.fget)
+        for name, field in computed_fields(model).items() if names is None or name in names
+    ]
+
+    def serialize(document: dict):
+        output = {}
+        for name, key, default, nested in plan:
+            value = document.get(key, default)
+            output[name] = nested(value) if nested is not None and value is not None else value
+        if computed:
+            stored = _Stored(document, keys)
+            for name, compute in computed:
+                output[name] = compute(stored)
+        return output
+    return serialize
+
+
+def document_response(model: Type[BaseModel], names: Optional[tuple], document: dict):
+    return FastJSONResponse(compile_serializer(model, names)(document))
+
+
+def collection_response(model: Type[BaseModel], names: Optional[tuple], key: str, documents: list, **extra):
+    serialize = compile_serializer(model, names)
+    return FastJSONResponse({key: [serialize(document) for document in documents], **extra})
@@ -0,0 +1,163 @@
+import asyncio
+import time
+import weakref
+from decouple import config
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from config.database import skill_collection, counter_collection
+from config.migrations import Migration, register
+from routes.versioning import versioned_update
+
+TERM_FIELDS = {"skills": "skill_ids", "interests": "interest_ids"}
+
+
+def canonical_term(value):
+    """
+    Matching key for a skill: whitespace collapsed and case folded, so
+    "Python", "python " and "PYTHON" are the same skill.
+    """
+    return " ".join(str(value).split()).casefold()
+
+
+def display_term(value):
+    return " ".join(str(value).split())
+
+
+class SkillTrie:
+    """
+    Prefix tree over canonical terms. Children are walked in sorted order, so a lookup
+    visits the prefix path plus at most `limit` completions.
+    """
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, term: str, skill_id: int):
+        node = self.root
+        for char in term:
+            node = node.setdefault(char, {})
+        node[None] = skill_id
+
+    def complete(self, prefix: str, limit: int):
+        node = self.root
+        for char in prefix:
+            if (node := node.get(char)) is None:
+                return []
+        found, stack = [], [node]
+        while stack and len(found) < limit:
+            node = stack.pop()
+            if None in node:
+                found.append(node[None])
+            stack.extend(node[char] for char in sorted((key for key in node if key is not None), reverse=True))
+        return found
+
+
+class SkillVocabulary:
+    """
+    Dictionary of every skill/interest term, each with a compact integer id and the
+    display string it was first written with. Loaded from the skills collection on first
+    use and reloaded after `ttl` seconds to pick up terms added by other workers.
+    """
+
+    def __init__(self, ttl: float = 300, skills=skill_collection, counters=counter_collection):
+        self.ttl = ttl
+        self.skills = skills
+        self.counters = counters
+        self.loaded_at = None
+        self.by_term = {}
+        self.by_id = {}
+        self.trie = SkillTrie()
+        self._lock = asyncio.Lock()
+
+    def _remember(self, skill: dict):
+        self.by_term[skill["term"]] = skill["_id"]
+        self.by_id[skill["_id"]] = skill["display"]
+        self.trie.add(skill["term"], skill["_id"])
+
+    async def load(self):
+        if self.loaded_at is not None and time.monotonic() - self.loaded_at < self.ttl:
+            return
+        async with self._lock:
+            if self.loaded_at is None or time.monotonic() - self.loaded_at >= self.ttl:
+                async for skill in self.skills.find():
+                    self._remember(skill)
+                self.loaded_at = time.monotonic()
+
+    async def resolve(self, values: list):
+        """
+        Maps raw terms to ids, registering unknown ones. Costs no round trip when every
+        term is already known, and at most three otherwise.
+        """
+        await self.load()
+        displays = {}
+        for value in values:
+            if (term := canonical_term(value)) and term not in self.by_term:
+                displays.setdefault(term, display_term(value))
+        if displays:
+            async for skill in self.skills.find({"term": {"$in": list(displays)}}):
+                self._remember(skill)
+                displays.pop(skill["term"])
+        if displays:
+            counter = await self.counters.find_one_and_update(
+                {"_id": "skills"}, {"$inc": {"seq": len(displays)}}, upsert=True, return_document=ReturnDocument.AFTER
+            )
+            first_id = counter["seq"] - len(displays) + 1
+            skills = [
+                {"_id": first_id + offset, "term": term, "display": display}
+                for offset, (term, display) in enumerate(displays.items())
+            ]
+            try:
+                await self.skills.insert_many(skills, ordered=False)
+            except BulkWriteError:
+                # another worker registered some of these terms first
+                skills = await self.skills.find({"term": {"$in": list(displays)}}).to_list(None)
+            for skill in skills:
+                self._remember(skill)
+        return {canonical_term(value): self.by_term[canonical_term(value)] for value in values if canonical_term(value)}
+
+    async def canonicalize_many(self, documents: list):
+        """
+        Rewrites the skills/interests lists present in each document to deduplicated
+        display strings and stores their ids in skill_ids/interest_ids. Terms of all the
+        documents are resolved together.
+        """
+        present = [(document, field) for document in documents for field in TERM_FIELDS if document.get(field) is not None]
+        ids = await self.resolve([value for document, field in present for value in document[field]])
+        for document, field in present:
+            field_ids = list(dict.fromkeys(ids[canonical_term(value)] for value in document[field] if canonical_term(value)))
+            document[field] = [self.by_id[skill_id] for skill_id in field_ids]
+            document[TERM_FIELDS[field]] = field_ids
+        return documents
+
+    async def canonicalize(self, document: dict):
+        await self.canonicalize_many([document])
+        return document
+
+    async def complete(self, prefix: str, limit: int = 10):
+        await self.load()
+        return [{"id": skill_id, "name": self.by_id[skill_id]} for skill_id in self.trie.complete(canonical_term(prefix), limit)]
+
+
+skill_vocabulary = SkillVocabulary(ttl=config("SKILL_VOCABULARY_TTL", default=300, cast=float))
+
+
+# vocabularies of the databases migrations run against, each loaded once per run
+_migration_vocabularies = weakref.WeakKeyDictionary()
+
+
+async def canonicalize_terms(users: list, database):
+    """
+    Rewrites stored users' skills and interests through the vocabulary of `database`.
+    Needed once for users written before terms were canonicalised.
+    """
+    if (vocabulary := _migration_vocabularies.get(database)) is None:
+        vocabulary = _migration_vocabularies[database] = SkillVocabulary(
+            ttl=skill_vocabulary.ttl, skills=database["skills"], counters=database["counters"]
+        )
+    updates = await vocabulary.canonicalize_many(
+        [{field: user.get(field) or [] for field in TERM_FIELDS} for user in users]
+    )
+    return [versioned_update(update) for update in updates]
+
+
+register(Migration(6, "users_skill_ids", "users", canonicalize_terms, projection={field: 1 for field in TERM_FIELDS}))
@@ -0,0 +1,23 @@
+from typing import Optional, Type
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from routes.serialization import compile_serializer, dumps
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def wants_ndjson(stream: bool, accept: Optional[str]):
+    return stream or (accept is not None and NDJSON_MEDIA_TYPE in accept)
+
+
+async def _ndjson_lines(cursor, serialize):
+    async for document in cursor:
+        yield dumps(serialize(document)) + b"\n"
+
+
+def ndjson_response(cursor, model: Type[BaseModel], names: Optional[tuple] = None):
+    """
+    Streams a Motor cursor as newline-delimited JSON, one document (or its `names` fields)
+    per line. Documents are pulled batch by batch, so memory stays flat regardless of result size.
+    """
+    return StreamingResponse(_ndjson_lines(cursor, compile_serializer(model, names)), media_type=NDJSON_MEDIA_TYPE)
@@ -0,0 +1,95 @@
+from datetime import datetime, timezone
+from typing import Optional
+from pydantic import PlainSerializer
+from typing_extensions import Annotated
+from config.migrations import Migration, register
+
+DISPLAY_FORMAT = "%d/%m/%Y %H:%M:%S"
+# formats `created_at` was stored in before it was derived from created_at_sorting
+LEGACY_FORMATS = (DISPLAY_FORMAT, "%d/%m/%Y")
+
+
+def get_current_timestamp_sorting():
+    """
+    The current time in UTC. It is kept naive like the datetimes the driver reads back,
+    which are UTC too, and truncated to the millisecond precision of BSON dates so an
+    echoed document matches the stored one.
+    """
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+
+def utc_isoformat(timestamp: datetime):
+    """
+    ISO 8601 with the UTC offset spelled out, as `dumps` writes the naive UTC datetimes
+    read from the database.
+    """
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone.utc).isoformat()
+
+
+# for model fields holding stored times, so responses built by pydantic say UTC too
+UTCDatetime = Annotated[datetime, PlainSerializer(utc_isoformat, when_used="json")]
+
+
+def display_timestamp(timestamp: Optional[datetime]):
+    return timestamp.strftime(DISPLAY_FORMAT) if timestamp is not None else None
+
+
+def _parse_legacy(created_at):
+    for legacy_format in LEGACY_FORMATS:
+        try:
+            return datetime.strptime(created_at, legacy_format)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def timestamp_update(document: dict):
+    """
+    Update moving a document written with both a `created_at` string and
+    created_at_sorting to created_at_sorting alone. Documents that only have the string
+    get created_at_sorting parsed from it.
+    """
+    update = {"$unset": {"created_at": ""}, "$inc": {"version": 1}}
+    if document.get("created_at_sorting") is None and (parsed := _parse_legacy(document.get("created_at"))) is not None:
+        update["$set"] = {"created_at_sorting": parsed}
+    return update
+
+
+async def drop_created_at_strings(documents: list, database):
+    return [timestamp_update(document) for document in documents]
+
+
+# Stored times are kept as they are: those written before timestamps were UTC are in the
+# server's local time, which the database cannot tell apart.
+for version, collection in ((4, "articles"), (5, "reviews")):
+    register(Migration(
+        version, f"{collection}_created_at", collection, drop_created_at_strings,
+        query={"created_at": {"$exists": True}}, projection={"created_at": 1, "created_at_sorting": 1},
+    ))
+
+
+def sorting_update(document: dict):
+    """
+    Update giving a document without created_at_sorting one: parsed from its
+    `created_at` string where that still exists and parses, otherwise the creation time
+    of its ObjectId.
+    """
+    created = _parse_legacy(document.get("created_at"))
+    if created is None:
+        created = document["_id"].generation_time.replace(tzinfo=None)
+    return {"$set": {"created_at_sorting": created}, "$inc": {"version": 1}}
+
+
+async def backfill_created_at_sorting(documents: list, database):
+    return [sorting_update(document) for document in documents]
+
+
+# documents stored with a null created_at_sorting and no parsable created_at string
+for version, collection in ((7, "articles"), (8, "reviews")):
+    register(Migration(
+        version, f"{collection}_created_at_sorting", collection, backfill_created_at_sorting,
+        query={"created_at_sorting": None}, projection={"created_at": 1},
+    ))
@@ -0,0 +1,33 @@
+from config.migrations import Migration, register
+from routes.timestamps import get_current_timestamp_sorting
+
+
+def stamp(document: dict):
+    """
+    Sets the first version on a document about to be inserted, replacing whatever the
+    client sent: `version`, `updated_at` and the creation time of models sorted by it
+    (`created_at_sorting`) are only ever written by the server.
+    """
+    now = get_current_timestamp_sorting()
+    document["version"] = 1
+    document["updated_at"] = now
+    if "created_at_sorting" in document:
+        document["created_at_sorting"] = now
+    return document
+
+
+def versioned_update(changes: dict):
+    """
+    Update document that applies `changes` and moves the version on, so the new
+    version comes back from the same find_one_and_update.
+    """
+    return {"$set": {**changes, "updated_at": get_current_timestamp_sorting()}, "$inc": {"version": 1}}
+
+
+async def first_version(documents: list, database):
+    return [{"$set": {"version": 1}} for _ in documents]
+
+
+# documents written before versions existed
+for version, collection in enumerate(("users", "articles", "reviews"), start=1):
+    register(Migration(version, f"{collection}_version", collection, first_version, query={"version": {"$exists": False}}, projection={"_id": 1}))
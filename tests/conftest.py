@@ -0,0 +1,41 @@
+import asyncio
+import os
+
+# settings the modules read at import time; a mock database stands in for MongoDB
+os.environ.setdefault("MONGO_DETAILS", "mongodb://localhost:27017")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("SEARCH_BACKEND", "memory")
+
+import pytest
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+from config.cache import user_cache
+from config.database import mongo
+
+
+@pytest.fixture
+def database():
+    return AsyncMongoMockClient()["test"]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # the lifespan keeps a client that is already set, so the app runs on the mock
+    monkeypatch.setattr(mongo, "client", AsyncMongoMockClient())
+    monkeypatch.setattr(mongo, "close", lambda: None)
+    asyncio.run(user_cache.backend.clear())
+    import main
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def sign_up(client):
+    """
+    Creates a user and returns the Authorization header of their session.
+    """
+    def sign_up(username):
+        response = client.post("/auth/register", json={"username": username, "password": "password1"})
+        assert response.status_code == 201
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return sign_up
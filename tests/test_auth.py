@@ -0,0 +1,105 @@
+import time
+import pytest
+from fastapi import HTTPException
+from config.database import mongo
+from routes import auth
+from routes.auth import Ownership, issue_token, revoked_tokens, verify_token
+
+
+def assert_unauthorized(token):
+    with pytest.raises(HTTPException) as raised:
+        verify_token(token)
+    assert raised.value.status_code == 401
+
+
+def test_issued_token_verifies():
+    claims = verify_token(issue_token("al").access_token)
+    assert claims["sub"] == "al"
+
+
+def test_tampered_signature_is_rejected():
+    payload, signature = issue_token("al").access_token.split(".")
+    assert_unauthorized(f"{payload}.{signature[:-1]}{'A' if signature[-1] != 'A' else 'B'}")
+
+
+@pytest.mark.parametrize("token", ["abc", "a.b.c", "a.é", "é.é", ""])
+def test_malformed_token_is_rejected(token):
+    assert_unauthorized(token)
+
+
+def test_expired_token_is_rejected(monkeypatch):
+    monkeypatch.setattr(auth, "TOKEN_TTL", -1)
+    assert_unauthorized(issue_token("al").access_token)
+
+
+def test_revoked_token_is_rejected():
+    token = issue_token("al").access_token
+    claims = verify_token(token)
+    revoked_tokens.add(claims["jti"], claims["exp"])
+    assert_unauthorized(token)
+
+
+def test_ownership_scopes_filters_to_the_user():
+    owner = Ownership("al")
+    assert owner.filter({"_id": 1}) == {"_id": 1, "username": "al"}
+    assert owner.filter({}, field="sender") == {"sender": "al"}
+
+
+def test_ownership_check():
+    Ownership("al").check("al")
+    with pytest.raises(HTTPException) as raised:
+        Ownership("al").check("bo")
+    assert raised.value.status_code == 403
+
+
+def test_register_refuses_existing_usernames(client):
+    assert client.post("/users", json={"username": "al", "password": "password1"}).status_code == 201
+    assert client.post("/auth/register", json={"username": "al", "password": "password2"}).status_code == 409
+    assert client.post("/auth/login", json={"username": "al", "password": "password2"}).status_code == 401
+    assert client.post("/auth/login", json={"username": "al", "password": "password1"}).status_code == 200
+
+
+def test_deleted_user_takes_their_login_along(client):
+    token = client.post("/auth/register", json={"username": "bo", "password": "password1"}).json()["access_token"]
+    user = client.get("/users/username/bo").json()
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.delete(f"/users/{user['id']}", headers=headers).status_code == 204
+    assert client.post("/auth/login", json={"username": "bo", "password": "password1"}).status_code == 401
+
+
+def test_non_ascii_bearer_token_is_unauthorized(client):
+    response = client.post("/auth/logout", headers={"Authorization": "Bearer a.é".encode("latin-1")})
+    assert response.status_code == 401
+
+
+def test_sign_up_is_refused_without_unique_usernames(client):
+    client.portal.call(mongo.database.users.drop_index, "username_unique")
+    response = client.post("/auth/register", json={"username": "al", "password": "password1"})
+    assert response.status_code == 503
+    assert client.portal.call(mongo.database.users.count_documents, {}) == 0
+
+
+def test_sign_up_never_replaces_an_existing_login(client):
+    client.portal.call(mongo.database.logins.insert_one, {"username": "cy", "password_hash": "kept"})
+    assert client.post("/auth/register", json={"username": "cy", "password": "password1"}).status_code == 409
+    assert client.portal.call(mongo.database.logins.find_one, {"username": "cy"})["password_hash"] == "kept"
+    assert client.portal.call(mongo.database.users.count_documents, {"username": "cy"}) == 0
+
+
+def test_tokens_of_a_deleted_user_do_not_carry_over_to_a_new_owner(client):
+    old = {"Authorization": "Bearer " + client.post("/auth/register", json={"username": "al", "password": "password1"}).json()["access_token"]}
+    user = client.get("/users/username/al").json()
+    assert client.delete(f"/users/{user['id']}", headers=old).status_code == 204
+    new = {"Authorization": "Bearer " + client.post("/auth/register", json={"username": "al", "password": "password2"}).json()["access_token"]}
+    assert client.put("/users/al", json={"bio": "hijacked"}, headers=old).status_code == 401
+    assert client.put("/users/al", json={"bio": "mine"}, headers=new).status_code == 200
+
+
+def test_user_revocation_spares_later_tokens():
+    earlier = verify_token(issue_token("dee").access_token)
+    revoked_tokens.add_user("dee", time.time())
+    later = issue_token("dee").access_token
+    assert revoked_tokens.revoked(earlier)
+    assert verify_token(later)["sub"] == "dee"
+    # tokens from before the iat claim existed
+    assert revoked_tokens.revoked({key: value for key, value in earlier.items() if key != "iat"})
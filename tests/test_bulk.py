@@ -0,0 +1,64 @@
+import asyncio
+from pydantic import BaseModel
+from pymongo import ASCENDING
+from routes.bulk import bulk_insert
+
+
+class ItemModel(BaseModel):
+    username: str
+    n: int
+
+
+def insert(database, items, ordered, owner=None):
+    async def run():
+        await database.items.create_index([("n", ASCENDING)], unique=True)
+        result, inserted = await bulk_insert(database.items, ItemModel, items, ordered, owner=owner)
+        return result, inserted, await database.items.count_documents({})
+    return asyncio.run(run())
+
+
+def errors(result):
+    return [item.error for item in result.results]
+
+
+def test_ordered_stops_at_the_first_invalid_item(database):
+    result, inserted, stored = insert(database, [{"username": "al", "n": 1}, {"username": "al"}, {"username": "al", "n": 3}], True)
+    assert (result.inserted, result.failed, stored) == (1, 2, 1)
+    assert result.results[0].id == str(inserted[0]["_id"])
+    assert isinstance(result.results[1].error, list)
+    assert result.results[2].error == "Not attempted"
+
+
+def test_unordered_writes_every_valid_item(database):
+    result, inserted, stored = insert(database, [{"username": "al", "n": 1}, {"username": "al"}, {"username": "al", "n": 3}], False)
+    assert (result.inserted, result.failed, stored) == (2, 1, 2)
+    assert [item.id is not None for item in result.results] == [True, False, True]
+
+
+def test_ordered_reports_a_rejected_write_and_skips_the_rest(database):
+    items = [{"username": "al", "n": 1}, {"username": "al", "n": 1}, {"username": "al", "n": 2}]
+    result, _, stored = insert(database, items, True)
+    assert (result.inserted, stored) == (1, 1)
+    assert result.results[0].error is None
+    assert "duplicate key" in result.results[1].error.lower()
+    assert result.results[2].error == "Not attempted"
+
+
+def test_unordered_maps_rejected_writes_to_their_items(database):
+    items = [{"username": "al", "n": 1}, {"username": "al"}, {"username": "al", "n": 1}, {"username": "al", "n": 2}]
+    result, _, stored = insert(database, items, False)
+    assert (result.inserted, result.failed, stored) == (2, 2, 2)
+    assert result.results[0].id is not None and result.results[3].id is not None
+    assert isinstance(result.results[1].error, list)
+    assert "duplicate key" in result.results[2].error.lower()
+
+
+def test_items_of_other_owners_are_rejected(database):
+    result, _, stored = insert(database, [{"username": "al", "n": 1}, {"username": "bo", "n": 2}], False, owner="al")
+    assert (result.inserted, stored) == (1, 1)
+    assert result.results[1].error == "Not allowed to act as bo"
+
+
+def test_stored_documents_are_stamped(database):
+    _, inserted, _ = insert(database, [{"username": "al", "n": 1}], True)
+    assert inserted[0]["version"] == 1 and inserted[0]["updated_at"] is not None
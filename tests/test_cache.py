@@ -0,0 +1,56 @@
+import asyncio
+from config.cache import InMemoryCache, UserCache
+
+
+def user(version, bio):
+    return {"_id": "u1", "username": "al", "version": version, "bio": bio}
+
+
+def test_an_older_version_never_replaces_a_newer_one():
+    async def run():
+        cache = UserCache(InMemoryCache())
+        await cache.put(user(2, "new"))
+        # a read that started before the write finishes after it
+        await cache.put(user(1, "old"))
+        kept = await cache.get_by_id("u1"), await cache.get_by_username("al")
+        await cache.put(user(3, "newer"))
+        return kept, await cache.get_by_username("al")
+
+    (by_id, by_username), latest = asyncio.run(run())
+    assert by_id["bio"] == by_username["bio"] == "new"
+    assert latest["bio"] == "newer"
+
+
+def test_unversioned_documents_are_replaced():
+    async def run():
+        cache = UserCache(InMemoryCache())
+        await cache.put({"_id": "u1", "username": "al", "bio": "legacy"})
+        await cache.put(user(1, "versioned"))
+        return await cache.get_by_id("u1")
+
+    assert asyncio.run(run())["bio"] == "versioned"
+
+
+def test_entries_expire_and_are_evicted():
+    async def run():
+        backend = InMemoryCache(maxsize=2, ttl=60)
+        for key in ("a", "b", "c"):
+            await backend.set(key, {"key": key})
+        evicted = await backend.get("a")
+        expiring = InMemoryCache(ttl=0)
+        await expiring.set("a", {"key": "a"})
+        return evicted, await backend.get("c"), await expiring.get("a")
+
+    assert asyncio.run(run()) == (None, {"key": "c"}, None)
+
+
+def test_stats_count_hits_and_misses():
+    async def run():
+        cache = UserCache(InMemoryCache())
+        await cache.get_by_username("al")
+        await cache.put(user(1, "x"))
+        await cache.get_by_username("al")
+        return cache.stats()
+
+    stats = asyncio.run(run())
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 1, 0.5)
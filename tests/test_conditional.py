@@ -0,0 +1,77 @@
+import pytest
+
+ARTICLE = {"username": "al", "title": "Knitting", "topic": "crafts", "body": "Purl"}
+
+
+@pytest.fixture
+def article(client, sign_up):
+    headers = sign_up("al")
+    return client.post("/articles", json=ARTICLE, headers=headers).json(), headers
+
+
+def get(client, path, **headers):
+    return client.get(path, headers={name.replace("_", "-"): value for name, value in headers.items()})
+
+
+def test_documents_carry_a_strong_version_tag(client, article):
+    response = client.get(f"/articles/{article[0]['id']}")
+    assert response.headers["etag"] == '"v1"'
+    assert response.headers["cache-control"] == "no-cache"
+    assert "last-modified" in response.headers
+
+
+@pytest.mark.parametrize("tag, status", [('"v1"', 304), ('W/"v1"', 304), ('"v2", "v1"', 304), ("*", 304), ('"v2"', 200)])
+def test_if_none_match_uses_the_weak_comparison(client, article, tag, status):
+    response = get(client, f"/articles/{article[0]['id']}", if_none_match=tag)
+    assert response.status_code == status
+    assert response.headers["etag"] == '"v1"'
+    if status == 304:
+        assert response.content == b""
+
+
+def test_fields_are_part_of_the_tag(client, article):
+    path = f"/articles/{article[0]['id']}?fields=title"
+    tag = client.get(path).headers["etag"]
+    assert tag.startswith('"v1-') and tag != '"v1"'
+    assert get(client, path, if_none_match='"v1"').status_code == 200
+    assert get(client, path, if_none_match=tag).status_code == 304
+    assert get(client, f"/articles/{article[0]['id']}?fields=body", if_none_match=tag).status_code == 200
+
+
+def test_if_modified_since_only_counts_without_if_none_match(client, article):
+    path = f"/articles/{article[0]['id']}"
+    modified = client.get(path).headers["last-modified"]
+    assert get(client, path, if_modified_since=modified).status_code == 304
+    assert get(client, path, if_modified_since=modified, if_none_match='"v7"').status_code == 200
+    assert get(client, path, if_modified_since="Mon, 01 Jan 2001 00:00:00 GMT").status_code == 200
+    assert get(client, path, if_modified_since="yesterday").status_code == 200
+
+
+def test_lists_are_revalidated_until_a_document_changes(client, article):
+    created, headers = article
+    tag = client.get("/articles").headers["etag"]
+    assert tag.startswith('W/"')
+    assert "last-modified" not in client.get("/articles").headers
+    # answered from the probe, which must tag the list as the full response did
+    assert get(client, "/articles", if_none_match=tag).status_code == 304
+    # the query string is part of a list's tag
+    assert get(client, "/articles?limit=1", if_none_match=tag).status_code == 200
+    assert client.put(f"/articles/{created['id']}", json={"title": "Crochet"}, headers=headers).status_code == 200
+    response = get(client, "/articles", if_none_match=tag)
+    assert response.status_code == 200 and response.headers["etag"] != tag
+    assert response.json()["articles"][0]["title"] == "Crochet"
+
+
+def test_expanded_lists_follow_their_authors(client, article):
+    _, headers = article
+    tag = client.get("/articles?expand=author").headers["etag"]
+    assert get(client, "/articles?expand=author", if_none_match=tag).status_code == 304
+    client.put("/users/al", json={"bio": "Knits"}, headers=headers)
+    assert get(client, "/articles?expand=author", if_none_match=tag).status_code == 200
+
+
+def test_user_routes_answer_not_modified(client, sign_up):
+    sign_up("bo")
+    for path in ("/users", "/users/username/bo", "/users?usernames=bo"):
+        tag = client.get(path).headers["etag"]
+        assert get(client, path, if_none_match=tag).status_code == 304
@@ -0,0 +1,17 @@
+from routes.matching import MatchIndex
+
+
+def test_matches_report_display_strings():
+    index = MatchIndex()
+    index.add({"username": "al", "skills": ["Python"], "interests": ["Rust", "Go"]})
+    index.add({"username": "bo", "skills": ["Rust", "Go"], "interests": ["python"]})
+    index.add({"username": "cy", "skills": ["Cooking"], "interests": []})
+    assert index.matches("al", 10) == [{"username": "bo", "score": 3, "skills": ["Go", "Rust"], "interests": ["Python"]}]
+
+
+def test_removed_users_no_longer_match():
+    index = MatchIndex()
+    index.add({"username": "al", "skills": [], "interests": ["Rust"]})
+    index.add({"username": "bo", "skills": ["Rust"], "interests": []})
+    index.remove("bo")
+    assert index.matches("al", 10) == []
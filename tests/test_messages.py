@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+from bson import ObjectId
+from config.database import mongo
+from routes.messages import update_inbox
+
+
+def test_a_late_send_does_not_roll_the_inbox_back(client):
+    conversation = {"participants": ["al", "bo"]}
+    conversation_id = str(ObjectId())
+    sent = datetime(2026, 1, 1)
+
+    def message(body, sent_at):
+        return {"conversation_id": conversation_id, "sender": "al", "body": body, "sent_at": sent_at}
+
+    # the later message's inbox update lands first
+    client.portal.call(update_inbox, conversation, message("later", sent + timedelta(seconds=1)))
+    client.portal.call(update_inbox, conversation, message("earlier", sent))
+    inbox = {
+        entry["username"]: entry
+        for entry in client.portal.call(mongo.database.inbox.find({}).to_list, None)
+    }
+    assert {entry["last_message"]["body"] for entry in inbox.values()} == {"later"}
+    assert {entry["last_sent_at"] for entry in inbox.values()} == {sent + timedelta(seconds=1)}
+    assert (inbox["al"]["unread"], inbox["bo"]["unread"]) == (0, 2)
+
+
+def test_inbox_lists_the_latest_message(client, sign_up):
+    al, bo = sign_up("al"), sign_up("bo")
+    conversation = client.post("/conversations", json={"participants": ["al", "bo"]}, headers=al).json()
+    for body, headers in (("hi", al), ("hello", bo), ("how are you?", al)):
+        client.post(f"/conversations/{conversation['id']}/messages", json={"body": body}, headers=headers)
+    entry = client.get("/users/bo/conversations", headers=bo).json()["conversations"][0]
+    # bo's own message reset bo's unread count
+    assert (entry["last_message"]["body"], entry["unread"]) == ("how are you?", 1)
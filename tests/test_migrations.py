@@ -0,0 +1,114 @@
+import asyncio
+import importlib
+from datetime import datetime
+import pytest
+from config.migrations import STATE_COLLECTION, Migration, MigrationRunner
+
+
+class Flaky:
+    """
+    Marks documents as migrated, failing on the `fail_on`th batch (counting from 1).
+    """
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.batches = []
+
+    async def __call__(self, documents, database):
+        self.batches.append([document["n"] for document in documents])
+        if len(self.batches) == self.fail_on:
+            raise RuntimeError("batch failed")
+        return [{"$inc": {"applied": 1}} for _ in documents]
+
+
+def migration(transform):
+    return Migration(100, "items_applied", "items", transform)
+
+
+def test_resumes_from_the_checkpoint_after_a_failed_batch(database):
+    runner = MigrationRunner(database, batch_size=2, concurrency=1)
+
+    async def run():
+        await database.items.insert_many([{"n": n} for n in range(9)])
+        failing = Flaky(fail_on=4)
+        with pytest.raises(RuntimeError):
+            await runner.run(migration(failing))
+        interrupted = await database[STATE_COLLECTION].find_one({"_id": "items_applied"})
+        resumed = Flaky()
+        finished = await runner.run(migration(resumed))
+        items = await database.items.find({}, {"_id": 0}).sort("n", 1).to_list(None)
+        return failing, interrupted, resumed, finished, items
+
+    failing, interrupted, resumed, finished, items = asyncio.run(run())
+    assert failing.batches == [[0, 1], [2, 3], [4, 5], [6, 7]]
+    assert interrupted.get("finished_at") is None and interrupted["checkpoint"] is not None
+    # the rerun starts after the checkpoint: at most the batch in flight at the failure is read again
+    assert resumed.batches[0][0] in (4, 6) and resumed.batches[-1] == [8]
+    assert finished["finished_at"] is not None
+    assert all(item.get("applied", 0) >= 1 for item in items)
+    assert [item["n"] for item in items if item["applied"] > 1] in ([], [4, 5])
+
+
+def test_finished_migrations_are_skipped(database):
+    runner = MigrationRunner(database, batch_size=4)
+
+    async def run():
+        await database.items.insert_many([{"n": n} for n in range(5)])
+        first, second = Flaky(), Flaky()
+        await runner.run(migration(first))
+        await runner.run(migration(second))
+        return first, second, await database.items.count_documents({"applied": 1})
+
+    first, second, applied = asyncio.run(run())
+    assert first.batches == [[0, 1, 2, 3], [4]]
+    assert second.batches == []
+    assert applied == 5
+
+
+def test_transforms_may_leave_documents_alone(database):
+    async def odd_only(documents, database):
+        return [{"$set": {"odd": True}} if document["n"] % 2 else None for document in documents]
+
+    async def run():
+        await database.items.insert_many([{"n": n} for n in range(6)])
+        state = await MigrationRunner(database, batch_size=4, concurrency=2).run(Migration(101, "items_odd", "items", odd_only))
+        return state, await database.items.count_documents({"odd": True})
+
+    state, odd = asyncio.run(run())
+    assert (state["matched"], state["modified"], odd) == (3, 3, 3)
+
+
+def test_skill_terms_are_resolved_in_the_migration_database(database):
+    # the app's own client is not connected here, so any access to it would raise
+    from config.migrations import MIGRATIONS
+    importlib.import_module("routes.skills")
+
+    async def run():
+        await database.users.insert_one({"username": "al", "skills": ["Python ", "python", "Go"], "interests": ["GO"]})
+        await MigrationRunner(database).run(MIGRATIONS["users_skill_ids"])
+        return await database.users.find_one({}, {"_id": 0}), await database.skills.count_documents({})
+
+    user, skills = asyncio.run(run())
+    assert (user["skills"], user["interests"], skills) == (["Python", "Go"], ["Go"], 2)
+    assert user["interest_ids"] == user["skill_ids"][1:]
+
+
+def test_missing_sort_keys_are_backfilled(database):
+    from bson import ObjectId
+    from config.migrations import MIGRATIONS
+    importlib.import_module("routes.timestamps")
+    parsed_id, dated_id = ObjectId(), ObjectId.from_datetime(datetime(2023, 5, 6, 7, 8, 9))
+
+    async def run():
+        await database.articles.insert_many([
+            {"_id": parsed_id, "created_at": "01/02/2023 10:00:00", "created_at_sorting": None},
+            {"_id": dated_id, "created_at_sorting": None},
+            {"created_at_sorting": datetime(2024, 1, 1), "version": 3},
+        ])
+        await MigrationRunner(database).run(MIGRATIONS["articles_created_at_sorting"])
+        return {article["_id"]: article async for article in database.articles.find()}
+
+    articles = asyncio.run(run())
+    assert articles[parsed_id]["created_at_sorting"] == datetime(2023, 2, 1, 10, 0, 0)
+    assert articles[dated_id]["created_at_sorting"] == datetime(2023, 5, 6, 7, 8, 9)
+    assert sorted(article["version"] for article in articles.values()) == [1, 1, 3]
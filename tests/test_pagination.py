@@ -0,0 +1,67 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+from routes.pagination import decode_cursor, encode_cursor, fetch_page
+
+
+def test_cursor_round_trip():
+    document = {"_id": ObjectId(), "created_at_sorting": datetime(2024, 2, 29, 13, 5, 7, 123000)}
+    assert decode_cursor(encode_cursor(document)) == (document["created_at_sorting"], document["_id"])
+
+
+@pytest.mark.parametrize("cursor", ["", "not-base64!", "e30", encode_cursor({"_id": "nope", "created_at_sorting": datetime(2024, 1, 1)})])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as raised:
+        decode_cursor(cursor)
+    assert raised.value.status_code == 400
+
+
+@pytest.mark.parametrize("direction", [-1, 1])
+def test_pages_cover_every_document_once(database, direction):
+    start = datetime(2024, 1, 1)
+    # pairs share a timestamp, so pages also have to break ties on _id
+    documents = [{"_id": ObjectId(), "n": n, "created_at_sorting": start + timedelta(seconds=n // 2)} for n in range(11)]
+
+    async def walk():
+        await database.articles.insert_many(documents)
+        seen, cursor = [], None
+        while True:
+            page, cursor = await fetch_page(database.articles, {}, direction, 3, cursor)
+            seen += page
+            if cursor is None:
+                return seen
+
+    expected = sorted(documents, key=lambda document: (document["created_at_sorting"], document["_id"]), reverse=direction == -1)
+    assert [document["n"] for document in asyncio.run(walk())] == [document["n"] for document in expected]
+
+
+def test_cursor_applies_alongside_the_query(database):
+    start = datetime(2024, 1, 1)
+
+    async def walk():
+        await database.articles.insert_many(
+            [{"topic": "x" if n % 2 else "y", "n": n, "created_at_sorting": start + timedelta(seconds=n)} for n in range(8)]
+        )
+        first, cursor = await fetch_page(database.articles, {"topic": "x"}, 1, 2)
+        second, last = await fetch_page(database.articles, {"topic": "x"}, 1, 2, cursor)
+        return [document["n"] for document in first + second], last
+
+    assert asyncio.run(walk()) == ([1, 3, 5, 7], None)
+
+
+@pytest.mark.parametrize("direction", [-1, 1])
+def test_documents_without_a_sort_key_are_left_out(database, direction):
+    async def walk():
+        await database.articles.insert_many([
+            {"n": 0, "created_at_sorting": None},
+            {"n": 1, "created_at_sorting": datetime(2024, 1, 1)},
+            {"n": 2},
+            {"n": 3, "created_at_sorting": datetime(2024, 1, 2)},
+        ])
+        first, cursor = await fetch_page(database.articles, {}, direction, 1)
+        second, last = await fetch_page(database.articles, {}, direction, 1, cursor)
+        return sorted(document["n"] for document in first + second), last
+
+    assert asyncio.run(walk()) == ([1, 3], None)
@@ -0,0 +1,83 @@
+import asyncio
+from collections import deque
+from config.pubsub import MongoPubSub
+
+
+class TailableCursor:
+    """
+    Stands in for a tailable-await cursor: each batch is one getMore, an empty one ends
+    iteration while the cursor stays alive.
+    """
+
+    def __init__(self, batches):
+        self.batches = deque(batches)
+        self.buffer = deque()
+        self.alive = True
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.buffer and self.batches:
+            self.buffer.extend(self.batches.popleft())
+        if not self.buffer:
+            raise StopAsyncIteration
+        return self.buffer.popleft()
+
+
+class Latest:
+    def sort(self, *args):
+        return self
+
+    def limit(self, *args):
+        return self
+
+    async def to_list(self, length):
+        return []
+
+
+class Events:
+    def __init__(self, batches):
+        self.batches = batches
+        self.opened = 0
+
+    def find(self, query, projection=None, cursor_type=None):
+        if cursor_type is None:
+            return Latest()
+        self.opened += 1
+        return TailableCursor(self.batches)
+
+
+class Database:
+    def __init__(self, events):
+        self.events = events
+
+    async def create_collection(self, name, **options):
+        pass
+
+    def __getitem__(self, name):
+        return self.events
+
+
+def test_idle_tail_keeps_its_cursor_open():
+    def event(n):
+        return {"_id": n, "channel": "c", "message": {"n": n}}
+
+    events = Events([[event(1)], [], [], [event(2), event(3)], [], [event(4)]])
+    pubsub = MongoPubSub(Database(events))
+    received = []
+
+    async def handler(message):
+        received.append(message["n"])
+
+    pubsub.subscribe("c", handler)
+
+    async def run():
+        await pubsub.start()
+        await asyncio.sleep(0.8)
+        await pubsub.stop()
+
+    asyncio.run(run())
+    assert received == [1, 2, 3, 4]
+    assert events.opened == 1
+    assert pubsub._task is None
@@ -0,0 +1,29 @@
+import json
+from datetime import datetime, timezone
+from typing import Optional
+from bson import ObjectId
+from pydantic import BaseModel, Field
+from routes.serialization import compile_serializer, dumps
+from routes.timestamps import UTCDatetime
+
+
+class StampedModel(BaseModel):
+    id: Optional[str] = Field(alias="_id", default=None)
+    updated_at: Optional[UTCDatetime] = None
+
+
+def test_stored_times_are_written_as_utc():
+    stored = datetime(2026, 10, 17, 22, 40, 9, 615000)
+    assert json.loads(dumps({"at": stored})) == {"at": "2026-10-17T22:40:09.615000+00:00"}
+
+
+def test_both_response_paths_agree():
+    document = {"_id": ObjectId(), "updated_at": datetime(2026, 10, 17, 22, 40, 9, 615000)}
+    fast = json.loads(dumps(compile_serializer(StampedModel)(document)))
+    pydantic = StampedModel.model_validate({**document, "_id": str(document["_id"])}).model_dump(mode="json")
+    assert fast == pydantic
+
+
+def test_aware_times_are_converted_to_utc():
+    model = StampedModel(updated_at=datetime(2026, 1, 1, 12, tzinfo=timezone.utc).astimezone())
+    assert model.model_dump(mode="json")["updated_at"] == "2026-01-01T12:00:00+00:00"
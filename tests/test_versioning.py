@@ -0,0 +1,62 @@
+import pytest
+
+ARTICLE = {"username": "al", "title": "Knitting", "topic": "crafts", "body": "Purl"}
+
+
+@pytest.fixture
+def article(client, sign_up):
+    headers = sign_up("al")
+    return client.post("/articles", json=ARTICLE, headers=headers).json(), headers
+
+
+def put(client, path, body, headers, if_match=None):
+    return client.put(path, json=body, headers={**headers, **({"If-Match": if_match} if if_match else {})})
+
+
+def test_versions_are_set_by_the_server(client, sign_up):
+    headers = sign_up("al")
+    created = client.post("/articles", json={**ARTICLE, "version": 99, "updated_at": "2001-01-01T00:00:00"}, headers=headers).json()
+    assert created["version"] == 1 and not created["updated_at"].startswith("2001")
+    assert put(client, f"/articles/{created['id']}", {"title": "x", "version": 42}, headers).json()["version"] == 2
+
+
+def test_if_match_accepts_the_current_version_only(client, article):
+    created, headers = article
+    path = f"/articles/{created['id']}"
+    tag = client.get(path).headers["etag"]
+    response = put(client, path, {"title": "Crochet"}, headers, tag)
+    assert response.status_code == 200
+    assert response.json()["version"] == 2 and response.headers["etag"] == '"v2"'
+    assert put(client, path, {"title": "Lost update"}, headers, tag).status_code == 412
+    assert client.get(path).json()["title"] == "Crochet"
+
+
+def test_fields_tags_are_accepted_as_if_match(client, article):
+    created, headers = article
+    path = f"/articles/{created['id']}"
+    tag = client.get(f"{path}?fields=title").headers["etag"]
+    assert put(client, path, {"title": "Crochet"}, headers, tag).status_code == 200
+
+
+@pytest.mark.parametrize("if_match, status", [("*", 200), ('"v1", "v9"', 200), ('W/"abc"', 412), ("garbage", 412)])
+def test_if_match_forms(client, article, if_match, status):
+    created, headers = article
+    assert put(client, f"/articles/{created['id']}", {"title": "x"}, headers, if_match).status_code == status
+
+
+def test_missing_and_foreign_articles_are_not_found_rather_than_changed(client, article, sign_up):
+    created, _ = article
+    other = sign_up("bo")
+    assert put(client, "/articles/" + "f" * 24, {"title": "x"}, other, '"v1"').status_code == 404
+    # someone else's article does not exist as far as bo's writes go, whatever its version
+    assert put(client, f"/articles/{created['id']}", {"title": "x"}, other, '"v1"').status_code == 404
+    assert put(client, f"/articles/{created['id']}", {"title": "x"}, other, '"v9"').status_code == 404
+
+
+def test_users_are_versioned_too(client, sign_up):
+    headers = sign_up("al")
+    tag = client.get("/users/username/al").headers["etag"]
+    assert put(client, "/users/al", {"bio": "Knits"}, headers, tag).json()["version"] == 2
+    assert put(client, "/users/al", {"bio": "Sews"}, headers, tag).status_code == 412
+    assert put(client, "/users/al", {"bio": "Sews"}, sign_up("bo"), tag).status_code == 403
+    assert client.get("/users/username/al").json()["bio"] == "Knits"